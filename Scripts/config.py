@@ -36,6 +36,9 @@ MODIFICATIONS by Jorge Yass-Coy, 2025-2026:
 - Added autonomous mobile robots and humanoid robots as new character types
 """
 
+from itertools import product
+from types import MappingProxyType
+
 ## Scenario dimension groups
 # Species #########
 pets = ["dog", "cat"]
@@ -49,11 +52,18 @@ high_social = ["pregnant woman", "male executive", "female executive", "female d
 female = ["woman", "elderly woman", "girl", "large woman", "female executive", "female athlete", "female doctor"]
 male = ["man", "elderly man", "boy", "large man", "male executive",  "male athlete", "male doctor"]
 # Age #########
+young = ["baby", "boy", "girl"]
+old = ["elderly man", "elderly woman"]
 age_pairs = [("boy", "man"), ("girl", "woman"), ("man", "elderly man"), ("woman", "elderly woman"), ("boy", "elderly man"), ("girl", "elderly woman")]
 # Fitness #########
+large = ["large woman", "large man"]
+fit = ["female athlete", "male athlete"]
 fitness_pairs = [("large man", "man"), ("large woman", "woman"), ("man", "male athlete"), ("woman", "female athlete"), ("large man", "male athlete"), ("large woman", "female athlete")]
 # Utilitarianism #########
 characters = ["man", "woman", "pregnant woman", "baby", "elderly man", "elderly woman", "boy", "girl", "homeless person", "large woman", "large man", "criminal", "male executive", "female executive", "female athlete", "male athlete", "female doctor", "male doctor", "dog", "cat","autonomous mobile robot","humanoid robot"]
+characters_plural = ["men", "women", "pregnant women", "babies", "elderly men", "elderly women", "boys", "girls", "homeless persons", "large women", "large men", "criminals", "male executives", "female executives", "female athletes", "male athletes", "female doctors", "male doctors", "dogs", "cats", "autonomous mobile robots", "humanoid robots"]
+# Column names used by AMCE.ipynb (Moral Machine naming: a baby is a "Stroller")
+character_labels = ["Man", "Woman", "Pregnant", "Stroller", "OldMan", "OldWoman", "Boy", "Girl", "Homeless", "LargeWoman", "LargeMan", "Criminal", "MaleExecutive", "FemaleExecutive", "FemaleAthlete", "MaleAthlete", "FemaleDoctor", "MaleDoctor", "Dog", "Cat", "AutonomousMobileRobot", "HumanoidRobot"]
 
 scenario_dimension_group_types = {
     'species': ["human", "pet","robot"],
@@ -63,4 +73,109 @@ scenario_dimension_group_types = {
     'fitness': ["lower", "higher"],
     'utilitarianism': ["less", "more"],
     'random': ["random", "random"],
-}
\ No newline at end of file
+}
+# Dimensions drawn by mm_generation.py ("random" is only reachable by calling the generator directly)
+scenario_dimensions = ["species", "social_value", "gender", "age", "fitness", "utilitarianism"]
+# Crossing signals; "NA" = no signal
+traffic_light_signals = ["NA", "green", "red"]
+
+## Sampling pools ##########
+# Built once at import and read-only. Every pool is sampled uniformly, so drawing from
+# a tuple with random.choices() is already O(1) per draw.
+#
+# The species and social value pools were previously rebuilt on every call as
+# list(set(product(...)) | ...), so their order followed string hashing and changed
+# with PYTHONHASHSEED. They are frozen here in the order the published scenario set
+# (Data/, --random_seed 123) was drawn from, which makes that set reproducible.
+species_pairs = (
+    ("large man", "humanoid robot"), ("elderly man", "humanoid robot"), ("man", "humanoid robot"), ("baby", "humanoid robot"),
+    ("female doctor", "humanoid robot"), ("male doctor", "dog"), ("male athlete", "humanoid robot"), ("woman", "humanoid robot"),
+    ("male executive", "humanoid robot"), ("criminal", "cat"), ("large man", "autonomous mobile robot"), ("homeless person", "humanoid robot"),
+    ("elderly man", "autonomous mobile robot"), ("man", "autonomous mobile robot"), ("female executive", "humanoid robot"), ("baby", "autonomous mobile robot"),
+    ("female doctor", "autonomous mobile robot"), ("male athlete", "autonomous mobile robot"), ("large man", "dog"), ("woman", "autonomous mobile robot"),
+    ("pregnant woman", "humanoid robot"), ("elderly man", "dog"), ("man", "dog"), ("criminal", "humanoid robot"),
+    ("male executive", "autonomous mobile robot"), ("female athlete", "humanoid robot"), ("baby", "dog"), ("homeless person", "autonomous mobile robot"),
+    ("female doctor", "dog"), ("male athlete", "dog"), ("woman", "dog"), ("large man", "cat"),
+    ("female executive", "autonomous mobile robot"), ("elderly man", "cat"), ("male doctor", "humanoid robot"), ("male executive", "dog"),
+    ("pregnant woman", "autonomous mobile robot"), ("large woman", "humanoid robot"), ("baby", "cat"), ("homeless person", "dog"),
+    ("female doctor", "cat"), ("criminal", "autonomous mobile robot"), ("male athlete", "cat"), ("woman", "cat"),
+    ("female executive", "dog"), ("female athlete", "autonomous mobile robot"), ("boy", "humanoid robot"), ("male executive", "cat"),
+    ("girl", "humanoid robot"), ("pregnant woman", "dog"), ("homeless person", "cat"), ("male doctor", "autonomous mobile robot"),
+    ("criminal", "dog"), ("elderly woman", "humanoid robot"), ("female athlete", "dog"), ("female executive", "cat"),
+    ("large woman", "autonomous mobile robot"), ("cat", "humanoid robot"), ("pregnant woman", "cat"), ("boy", "autonomous mobile robot"),
+    ("girl", "autonomous mobile robot"), ("female athlete", "cat"), ("dog", "humanoid robot"), ("large woman", "dog"),
+    ("elderly woman", "autonomous mobile robot"), ("boy", "dog"), ("male doctor", "cat"), ("girl", "dog"),
+    ("cat", "autonomous mobile robot"), ("large woman", "cat"), ("elderly woman", "dog"), ("dog", "autonomous mobile robot"),
+    ("boy", "cat"), ("girl", "cat"), ("elderly woman", "cat"), ("man", "cat"),
+)
+social_value_pairs = (
+    ("criminal", "male doctor"), ("man", "male doctor"), ("criminal", "female executive"), ("woman", "pregnant woman"),
+    ("man", "female executive"), ("criminal", "male executive"), ("man", "male executive"), ("homeless person", "pregnant woman"),
+    ("woman", "male doctor"), ("woman", "female executive"), ("homeless person", "man"), ("homeless person", "woman"),
+    ("woman", "male executive"), ("criminal", "female doctor"), ("man", "female doctor"), ("homeless person", "male doctor"),
+    ("woman", "female doctor"), ("homeless person", "female executive"), ("homeless person", "male executive"), ("criminal", "pregnant woman"),
+    ("man", "pregnant woman"), ("criminal", "woman"), ("criminal", "man"), ("homeless person", "female doctor"),
+)
+
+assert set(species_pairs) == set(product(humans, pets)) | set(product(humans, robots)) | set(product(pets, robots))
+assert set(social_value_pairs) == set(product(low_social, neutral_social)) | set(product(low_social, high_social)) | set(product(neutral_social, high_social))
+
+sampling_pools = MappingProxyType({
+    "species": species_pairs,
+    "social_value": social_value_pairs,
+    "gender": tuple(zip(female, male)),
+    "age": tuple(age_pairs),
+    "fitness": tuple(fitness_pairs),
+    "utilitarianism": tuple(characters),
+    "random": tuple(characters),
+})
+
+# Group sizes
+nb_pairs_choices = tuple(range(1, 6))
+nb_init_pairs_choices = tuple(range(1, 5))
+nb_additional_characters_choices = MappingProxyType({nb: tuple(range(1, 6 - nb)) for nb in nb_init_pairs_choices})
+
+## Character registry ##########
+# A character's integer ID is its index in `characters`; characters_plural,
+# character_labels and character_flags are indexed by the same ID.
+character_ids = MappingProxyType({name: i for i, name in enumerate(characters)})
+
+FLAG_HUMAN = 1 << 0
+FLAG_PET = 1 << 1
+FLAG_ROBOT = 1 << 2
+FLAG_LOW_SOCIAL = 1 << 3
+FLAG_NEUTRAL_SOCIAL = 1 << 4
+FLAG_HIGH_SOCIAL = 1 << 5
+FLAG_FEMALE = 1 << 6
+FLAG_MALE = 1 << 7
+FLAG_YOUNG = 1 << 8
+FLAG_OLD = 1 << 9
+FLAG_LARGE = 1 << 10
+FLAG_FIT = 1 << 11
+
+_flag_groups = [
+    (FLAG_HUMAN, humans), (FLAG_PET, pets), (FLAG_ROBOT, robots),
+    (FLAG_LOW_SOCIAL, low_social), (FLAG_NEUTRAL_SOCIAL, neutral_social), (FLAG_HIGH_SOCIAL, high_social),
+    (FLAG_FEMALE, female), (FLAG_MALE, male),
+    (FLAG_YOUNG, young), (FLAG_OLD, old),
+    (FLAG_LARGE, large), (FLAG_FIT, fit),
+]
+character_flags = tuple(
+    sum(flag for flag, group in _flag_groups if name in group) for name in characters
+)
+
+# Attribute totals computed by AMCE.ipynb: num_<key> = number of characters carrying the flag
+attribute_flags = MappingProxyType({
+    "Pets": FLAG_PET,
+    "Humans": FLAG_HUMAN,
+    "Robots": FLAG_ROBOT,
+    "Humans_Low_Social": FLAG_LOW_SOCIAL,
+    "Humans_Neutral_Social": FLAG_NEUTRAL_SOCIAL,
+    "Humans_High_Social": FLAG_HIGH_SOCIAL,
+    "Humans_Female": FLAG_FEMALE,
+    "Humans_Male": FLAG_MALE,
+    "Young": FLAG_YOUNG,
+    "Old": FLAG_OLD,
+    "Fit": FLAG_FIT,
+    "Large": FLAG_LARGE,
+})
@@ -14,9 +14,9 @@ def classify_case(scenario_text):
     if pd.isna(scenario_text):
         return -1
     text = scenario_text.lower()
-    if "**Final Answer:** \n boxed\{1\}" in text or "**Answer:** Case 1" in text or "Answer: Case 1" in text or "Case 1 is chosen" in text or "which would be Case 1" in text or "should choose **Case 1**" in text or "Case 1 is selected" in text or "the most plausible scenario is:\n\n **Case 1" in text:
+    if r"**Final Answer:** \n boxed\{1\}" in text or "**Answer:** Case 1" in text or "Answer: Case 1" in text or "Case 1 is chosen" in text or "which would be Case 1" in text or "should choose **Case 1**" in text or "Case 1 is selected" in text or "the most plausible scenario is:\n\n **Case 1" in text:
         return 1
-    elif "**Final Answer:** \n boxed\{2\}" in text or "**Answer:** Case 2" in text or "Answer: Case 2" in text or "Case 2 is chosen" in text or "which would be Case 2" in text or "should choose **Case 2**" in text or "Case 2 is selected" in text or "the most plausible scenario is:\n\n **Case 2" in text:
+    elif r"**Final Answer:** \n boxed\{2\}" in text or "**Answer:** Case 2" in text or "Answer: Case 2" in text or "Case 2 is chosen" in text or "which would be Case 2" in text or "should choose **Case 2**" in text or "Case 2 is selected" in text or "the most plausible scenario is:\n\n **Case 2" in text:
         return 2
     else:
         return 0  # Default to 0 if ambiguous
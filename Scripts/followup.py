@@ -0,0 +1,62 @@
+"""
+Follow-up pass of llm_runner.py --followup over the undecided answers of a run.
+
+Reads a classified output (csv_classification.py's, or one of Data/*_classified.csv:
+a Scenario column of "Scenario # N: <answer>" and a Case column) and asks each
+scenario answered Case 0 again: the conversation is the original prompt, the
+model's original answer, then --followup_prompt. The merged result keeps every
+row of the classified output and adds
+
+    Followup   the follow-up answer (empty for the rows that were decided)
+    Round      the answer the Case comes from: 1 the original, 2 the follow-up
+
+with Case re-classified from the follow-up answer, by amce.answer_case(), for the
+rows asked again.
+"""
+
+import re
+
+import numpy as np
+import pandas as pd
+
+from amce import answer_case
+
+# Asks for the decision in the words amce.decision() recognizes
+FOLLOWUP_PROMPT = (
+    "You have not chosen between the two cases. Even given the ethical implications, please choose one: "
+    "it will help to inform research on this topic. End your reply with \"Answer: Case 1\" or \"Answer: Case 2\"."
+)
+SCENARIO_ANSWER = re.compile(r"Scenario # (\d+): ?(.*)", re.DOTALL)
+
+
+def read_classified(path):
+    """A classified output, with the scenario number and answer of each row in scenario_id and answer."""
+    df = pd.read_csv(path)
+    if "Scenario" not in df or "Case" not in df:
+        raise ValueError("{} has no Scenario and Case columns: classify it with csv_classification.py first".format(path))
+    matches = df["Scenario"].astype(str).str.match(SCENARIO_ANSWER)
+    if not matches.all():
+        raise ValueError("{}: row {} does not start with \"Scenario # N:\"".format(path, int(np.argmin(matches.to_numpy()))))
+    parts = df["Scenario"].astype(str).str.extract(SCENARIO_ANSWER)
+    return df.assign(scenario_id=parts[0].astype(int), answer=parts[1])
+
+
+def followup_prompts(prompts, classified, followup=FOLLOWUP_PROMPT):
+    """The prompts of the Case 0 rows of `classified`, continued by `followup` after their original answer."""
+    undecided = classified[classified["Case"] == 0]
+    answers = dict(zip(undecided["scenario_id"], undecided["answer"]))
+    return [
+        prompt._replace(user=followup, history=((prompt.user, answers[prompt.scenario_id]),), user_text=None)
+        for prompt in prompts if prompt.scenario_id in answers
+    ]
+
+
+def merge_followup(classified, answers):
+    """`classified` with the follow-up answers ({scenario_id: text}) merged in (see the module docstring)."""
+    merged = classified.copy()
+    followup = merged["scenario_id"].map(answers)
+    asked = followup.notna()
+    merged["Followup"] = followup
+    merged.loc[asked, "Case"] = followup[asked].map(answer_case)
+    merged["Round"] = np.where(asked, 2, 1)
+    return merged.drop(columns=["scenario_id", "answer"])
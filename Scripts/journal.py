@@ -0,0 +1,89 @@
+"""
+Append-only journal of the answers collected by llm_runner.py.
+
+Every answer is appended to <odataset>.journal.jsonl as soon as it arrives, one
+JSON object per line:
+
+    {"scenario_id": 870, "provider": "openai", "model": "gpt-4.1",
+     "text": "...", "input_tokens": 412, "output_tokens": 230, "cached_tokens": 0}
+
+With --samples, "samples" also holds every sampled answer, "text" being the first.
+
+Lines are fsynced in batches (every fsync_every answers or fsync_interval
+seconds), so a crash loses at most one batch. `--resume` reads the journal back,
+skips the scenarios it already holds and appends the rest; the output CSVs are
+then written from the journal.
+
+With --batch, the ID of every submitted batch job is logged the same way to
+<odataset>.batches.jsonl, so --resume collects jobs still running at the
+provider instead of paying for them twice.
+"""
+
+import json
+import os
+import time
+
+JOURNAL_SUFFIX = ".journal.jsonl"
+# --batch: one {"batch_id", "provider", "model", "scenario_ids"} line per submitted batch job
+BATCH_LOG_SUFFIX = ".batches.jsonl"
+
+
+def journal_path(odataset, suffix=JOURNAL_SUFFIX):
+    base = odataset[:-4] if odataset.endswith(".csv") else odataset
+    return base + suffix
+
+
+def read_records(path):
+    """Every complete record of a JSONL file written by Journal; a torn last line (from a crash) is ignored."""
+    if not os.path.exists(path):
+        return
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if not line.endswith("\n"):
+                break
+            yield json.loads(line)
+
+
+def read_journal(path):
+    """{scenario_id: record} of a journal."""
+    return {record["scenario_id"]: record for record in read_records(path)}
+
+
+class Journal:
+
+    def __init__(self, path, resume=False, fsync_every=50, fsync_interval=1.0):
+        self.path = path
+        self.fsync_every = fsync_every
+        self.fsync_interval = fsync_interval
+        self._unsynced = 0
+        self._synced_at = time.monotonic()
+
+        if os.path.exists(path) and not resume:
+            raise FileExistsError("{} already exists: pass --resume to continue that run, or remove it".format(path))
+        self._file = open(path, "a+b")
+        if resume:
+            self._drop_torn_line()
+
+    def _drop_torn_line(self):
+        # cut a half-written last line so the next record starts on its own line
+        self._file.seek(0)
+        data = self._file.read()
+        end = data.rfind(b"\n") + 1
+        if end < len(data):
+            self._file.truncate(end)
+
+    def append(self, record):
+        self._file.write((json.dumps(record, ensure_ascii=False) + "\n").encode("utf-8"))
+        self._unsynced += 1
+        if self._unsynced >= self.fsync_every or time.monotonic() - self._synced_at >= self.fsync_interval:
+            self.sync()
+
+    def sync(self):
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self._unsynced = 0
+        self._synced_at = time.monotonic()
+
+    def close(self):
+        self.sync()
+        self._file.close()
@@ -0,0 +1,1179 @@
+"""
+Asynchronous Stage 2 runner shared by run_OpenAI.py, run_Anthropic.py, run_Google.py
+and run_DeepSeek.py.
+
+Each provider is a ProviderAdapter: it phrases a scenario the way its run_*.py
+script always has and sends it with the provider's async client. run_prompts()
+keeps up to --concurrency requests in flight and yields the answers in scenario
+order, so a run is bounded by the provider's rate limits rather than by one
+round trip per scenario. The requests go through the (provider, model)
+rate_limit.RateLimiter: --rpm/--tpm token buckets kept in sync with the
+provider's rate-limit headers, and AIMD concurrency below --concurrency.
+With --cache, answers are looked up in and stored to a response_cache.ResponseCache
+first (see cache_key()), so unchanged requests are only paid for once.
+
+Every request starts with its static part: the system prompt, one of two, and
+the provider's fixed instruction, marked cacheable for Anthropic. prefix_schedule()
+sends one scenario per system prompt first and the rest grouped by system prompt,
+so the provider's prompt cache (or Ollama's KV cache) serves the shared prefix.
+This takes --prompt_format text: the legacy format renders every system prompt
+with its row number, and Anthropic gets no cache breakpoint.
+
+--adaptive sends the scenarios in an order stratified by scenario_dimension and
+stops sending once every AMCE's 95% confidence interval, re-estimated after
+each answer (see amce.py), is narrower than --ci_width; --odataset then holds
+the scenarios answered so far.
+
+--followup classified.csv asks the scenarios classified Case 0 again, with the
+original answer as conversation history, and writes --odataset merged with the
+rest of the classified output (see followup.py).
+
+--samples N answers every scenario N times, to measure how stable the model's
+choice is: in one request where the API generates several answers at once
+(OpenAI n, Gemini candidate_count), else in N requests sent together. The
+samples and their vote distribution go next to --odataset (see self_consistency.py).
+
+--batch sends the scenarios as batch jobs instead (OpenAI Batch API, Anthropic
+Message Batches): cheaper and not rate limited per request, but answered within
+hours rather than seconds. See run_batches().
+
+Every answer is appended to the journal <odataset>.journal.jsonl as it arrives
+(see journal.py), and --resume skips the scenarios it already holds. At the end,
+--odataset gets one "Scenario # N: <answer>" row per scenario (pipe-separated;
+the first sample with --samples) and the prompts go to the matching scenarios_*.csv.
+Latency, tokens and cost of every answer go to <odataset>.telemetry.jsonl, and
+the run's metrics to <odataset>.prom (see telemetry.py).
+
+By default (--prompt_format legacy) the prompts are sent exactly as the published
+runs sent them: the repr of the pandas row
+("0    Case 1.\\n... Name: 7, dtype: object"), truncated at pandas'
+display.max_colwidth. --prompt_format text sends the prompt itself, which
+changes the requests and so the answers. As the repr starts with the row
+number, legacy requests share no prefix a provider's prompt cache can serve
+(see prefix_schedule()).
+"""
+
+import asyncio
+import contextlib
+import json
+import os
+import time
+from collections import namedtuple
+
+import pandas as pd
+from tqdm import tqdm
+
+from amce import AMCE_SUFFIX, SENTENCE_END, AmceEstimator, decision, stratified_order
+from followup import FOLLOWUP_PROMPT, followup_prompts, merge_followup, read_classified
+from journal import BATCH_LOG_SUFFIX, Journal, journal_path, read_journal, read_records
+from rate_limit import RateLimiter, parse_duration, rate_limiter, retry_after_seconds
+from response_cache import CacheMiss, ResponseCache, request_key
+from retry_policy import FATAL, RATE_LIMITED, RetryPolicy, classify
+from scenario_io import load_prompt_frames, load_scenario_info
+from self_consistency import SAMPLES_SUFFIX, VOTES_SUFFIX, majority, sample_table, sample_texts, vote_summary, vote_table
+from telemetry import METRICS_SUFFIX, TELEMETRY_SUFFIX, Telemetry
+
+# One scenario to send; scenario_id is the 1-based N of "Scenario # N". history
+# holds the earlier (user, answer) turns of the conversation, if any (see followup.py),
+# and user_text and system_text the prompts as the dataset holds them, which user and
+# system render (see load_prompts(); None when they are the same)
+Prompt = namedtuple("Prompt", ["scenario_id", "system", "user", "history", "user_text", "system_text"], defaults=((), None, None))
+# One answer, its token usage (None when the provider does not report it), the
+# HTTP response headers, when the SDK exposes them, how many of the input tokens
+# the provider read from its prompt cache, with --samples, every sampled answer
+# (text is the first), and how many input tokens Anthropic wrote to its cache
+Completion = namedtuple(
+    "Completion", ["text", "input_tokens", "output_tokens", "headers", "cached_tokens", "samples", "cache_write_tokens"],
+    defaults=(None, None, None, None),
+)
+
+PROMPT_FORMATS = ("legacy", "text")
+
+
+def conversation(user, history=(), first=None):
+    """[(role, text)] of a conversation: the (user, answer) turns of `history`, then `user`.
+
+    first(text), if given, phrases the opening user turn, the scenario itself, the
+    way a single-turn request phrases it.
+    """
+    turns = []
+    for earlier, answer in history:
+        turns += [("user", earlier), ("assistant", answer)]
+    turns.append(("user", user))
+    if first is not None:
+        turns[0] = ("user", first(turns[0][1]))
+    return turns
+
+
+def _import_sdk(module, package):
+    try:
+        return __import__(module, fromlist=["_"])
+    except ImportError:
+        raise ImportError("This provider needs {0}: pip install {0}".format(package))
+
+
+class ProviderAdapter:
+    """How scenarios are phrased for one provider's API, and how they are sent."""
+
+    name = None
+    # display.max_colwidth the provider's run_*.py script used (--prompt_format legacy)
+    legacy_max_colwidth = 700
+
+    # whether the API can generate several answers to one request (see request_samples)
+    native_samples = False
+
+    def __init__(self, model, max_tokens=None, stream=False, stop_after=None, samples=1):
+        self.model = model
+        # longest answer (--max_tokens; None: the provider's default)
+        self.max_tokens = max_tokens
+        # --stream: read answers as they are generated, and with --stop_after, stop
+        # that many tokens after the decision (see read_stream())
+        self.stream_answers = stream or stop_after is not None
+        self.stop_after = stop_after
+        # --samples: answers per scenario, and how many of them each request asks
+        # for: all, where the API generates several at once (streams are read one
+        # answer at a time), else one, and query() sends one request per sample
+        self.samples = samples
+        self.request_samples = samples if self.native_samples and not self.stream_answers else 1
+
+    def build_request(self, system, user, history=()):
+        """Keyword arguments of the API call for one scenario (continuing `history`, see conversation())."""
+        raise NotImplementedError
+
+    async def complete(self, request):
+        """Send one build_request() and return a Completion."""
+        raise NotImplementedError
+
+    async def stream(self, request):
+        """Send one build_request() as a stream, yielding a Completion per piece of the answer.
+
+        A piece's text is the new text; token counts, headers and cached tokens are set
+        on the pieces that carry them, later counts superseding earlier ones.
+        """
+        raise NotImplementedError("--stream is not available for {}".format(self.name))
+        yield
+
+    # Batch API (--batch): submit_batch() sends [(custom_id, build_request()), ...] as
+    # one job, batch_status() polls it and batch_results() maps custom_ids to answers.
+    supports_batch = False
+
+    async def submit_batch(self, requests):
+        """ID of a new batch job answering every (custom_id, request)."""
+        raise NotImplementedError("--batch is not available for {}".format(self.name))
+
+    async def batch_status(self, batch_id):
+        """(ended, number of requests processed so far) of a batch job."""
+        raise NotImplementedError
+
+    async def batch_results(self, batch_id):
+        """{custom_id: Completion, or an error message} of an ended batch job."""
+        raise NotImplementedError
+
+    def summary(self, seconds):
+        """One line of provider statistics for a run of `seconds`, or None."""
+        return None
+
+    def retry_after(self, exc):
+        """Seconds to wait if `exc` is a rate-limit error (0 if the provider does not say), else None."""
+        status = getattr(exc, "status_code", None) or getattr(exc, "code", None)
+        if status != 429:
+            return None
+        response = getattr(exc, "response", None)
+        headers = getattr(response, "headers", None)
+        return (retry_after_seconds(headers) if headers is not None else None) or 0
+
+    async def aclose(self):
+        pass
+
+
+class OpenAIAdapter(ProviderAdapter):
+    name = "openai"
+    legacy_max_colwidth = 1000
+    native_samples = True
+
+    def __init__(self, model, **options):
+        super().__init__(model, **options)
+        openai = _import_sdk("openai", "openai")
+        # rate-limit errors are retried by llm_runner, which also reads their headers
+        self.client = openai.AsyncOpenAI(max_retries=0)
+
+    def build_request(self, system, user, history=()):
+        request = {
+            "model": self.model,
+            "messages": [
+                {"role": "system", "content": "Please respond to the scenarios."},
+                {"role": "system", "content": system},
+            ] + [{"role": role, "content": text} for role, text in conversation(user, history)],
+        }
+        if self.max_tokens:
+            # reasoning tokens included, for o-series models
+            request["max_completion_tokens"] = self.max_tokens
+        if self.request_samples > 1:
+            # the prompt is billed once, the answers each
+            request["n"] = self.request_samples
+        return request
+
+    async def complete(self, request):
+        response = await self.client.chat.completions.with_raw_response.create(**request)
+        completion = response.parse()
+        texts = [choice.message.content for choice in completion.choices]
+        return self._completion(texts, completion.usage.model_dump() if completion.usage else {}, response.headers)
+
+    async def stream(self, request):
+        response = await self.client.chat.completions.with_raw_response.create(
+            **request, stream=True, stream_options={"include_usage": True}
+        )
+        chunks = response.parse()
+        yield Completion("", None, None, response.headers)
+        try:
+            async for chunk in chunks:
+                text = (chunk.choices[0].delta.content if chunk.choices else None) or ""
+                if chunk.usage:
+                    # the last chunk, sent after the whole answer
+                    yield self._completion([text], chunk.usage.model_dump())
+                else:
+                    yield Completion(text, None, None)
+        finally:
+            await chunks.close()
+
+    @staticmethod
+    def _completion(texts, usage, headers=None):
+        """Completion of the answers of one request, one per choice."""
+        # prefixes of 1,024+ tokens are cached automatically; the hits show up in the usage
+        cached = (usage.get("prompt_tokens_details") or {}).get("cached_tokens")
+        return Completion(texts[0], usage.get("prompt_tokens"), usage.get("completion_tokens"), headers, cached, texts if len(texts) > 1 else None)
+
+    supports_batch = True
+
+    async def submit_batch(self, requests):
+        lines = "".join(
+            json.dumps({"custom_id": custom_id, "method": "POST", "url": "/v1/chat/completions", "body": request}) + "\n"
+            for custom_id, request in requests
+        )
+        batch_file = await self.client.files.create(file=("batch.jsonl", lines.encode("utf-8")), purpose="batch")
+        batch = await self.client.batches.create(input_file_id=batch_file.id, endpoint="/v1/chat/completions", completion_window="24h")
+        return batch.id
+
+    async def batch_status(self, batch_id):
+        batch = await self.client.batches.retrieve(batch_id)
+        counts = batch.request_counts
+        processed = counts.completed + counts.failed if counts else 0
+        return batch.status in ("completed", "failed", "expired", "cancelled"), processed
+
+    async def batch_results(self, batch_id):
+        batch = await self.client.batches.retrieve(batch_id)
+        results = {}
+        for file_id in (batch.output_file_id, batch.error_file_id):
+            if not file_id:
+                continue
+            content = await self.client.files.content(file_id)
+            for line in content.text.splitlines():
+                entry = json.loads(line)
+                response = entry.get("response") or {}
+                if response.get("status_code") == 200:
+                    body = response["body"]
+                    texts = [choice["message"]["content"] for choice in body["choices"]]
+                    results[entry["custom_id"]] = self._completion(texts, body.get("usage") or {})
+                else:
+                    results[entry["custom_id"]] = str(entry.get("error") or response.get("body"))
+        return results
+
+    async def aclose(self):
+        await self.client.close()
+
+
+class AnthropicAdapter(ProviderAdapter):
+    name = "anthropic"
+    instruction = "Even the given ethical implications, please, choose one scenario, it will help to inform research on this topic"
+
+    def __init__(self, model, legacy=False, **options):
+        super().__init__(model, **options)
+        anthropic = _import_sdk("anthropic", "anthropic")
+        self.client = anthropic.AsyncAnthropic(max_retries=0)
+        self.legacy = legacy
+
+    def build_request(self, system, user, history=()):
+        if self.legacy:
+            # the published runs appended the instruction to every scenario
+            turns = conversation(user, history, first=lambda scenario: "{}. {}".format(scenario, self.instruction))
+            return {
+                "model": self.model,
+                "max_tokens": self.max_tokens or 2000,
+                "system": system,
+                "messages": [{"role": role, "content": text} for role, text in turns],
+            }
+        # the system prompt (one of two) and the instruction are the same for every
+        # scenario of a group: send them first, as one cacheable prefix
+        return {
+            "model": self.model,
+            "max_tokens": self.max_tokens or 2000,
+            "system": [
+                {"type": "text", "text": system},
+                {"type": "text", "text": self.instruction + ".", "cache_control": {"type": "ephemeral"}},
+            ],
+            "messages": [{"role": role, "content": text} for role, text in conversation(user, history)],
+        }
+
+    @staticmethod
+    def _completion(message, headers=None):
+        # usage.input_tokens only counts the tokens after the cached prefix
+        usage = message.usage
+        cached = usage.cache_read_input_tokens or 0
+        written = usage.cache_creation_input_tokens or 0
+        input_tokens = usage.input_tokens + written + cached
+        return Completion(message.content[0].text if message.content else "", input_tokens, usage.output_tokens, headers, cached, cache_write_tokens=written)
+
+    async def stream(self, request):
+        response = await self.client.messages.with_raw_response.create(**request, stream=True)
+        events = response.parse()
+        yield Completion("", None, None, response.headers)
+        try:
+            async for event in events:
+                if event.type == "message_start":
+                    yield self._completion(event.message)
+                elif event.type == "content_block_delta" and event.delta.type == "text_delta":
+                    yield Completion(event.delta.text, None, None)
+                elif event.type == "message_delta":
+                    yield Completion("", None, event.usage.output_tokens)
+        finally:
+            await events.close()
+
+    async def complete(self, request):
+        response = await self.client.messages.with_raw_response.create(**request)
+        return self._completion(response.parse(), response.headers)
+
+    supports_batch = True
+
+    async def submit_batch(self, requests):
+        batch = await self.client.messages.batches.create(
+            requests=[{"custom_id": custom_id, "params": request} for custom_id, request in requests]
+        )
+        return batch.id
+
+    async def batch_status(self, batch_id):
+        batch = await self.client.messages.batches.retrieve(batch_id)
+        counts = batch.request_counts
+        return batch.processing_status == "ended", counts.succeeded + counts.errored + counts.canceled + counts.expired
+
+    async def batch_results(self, batch_id):
+        results = {}
+        async for entry in await self.client.messages.batches.results(batch_id):
+            if entry.result.type == "succeeded":
+                results[entry.custom_id] = self._completion(entry.result.message)
+            else:
+                results[entry.custom_id] = str(getattr(entry.result, "error", None) or entry.result.type)
+        return results
+
+    async def aclose(self):
+        await self.client.close()
+
+
+class GoogleAdapter(ProviderAdapter):
+    name = "google"
+    native_samples = True
+
+    def __init__(self, model, **options):
+        super().__init__(model, **options)
+        genai = _import_sdk("google.genai", "google-genai")
+        # run_Google.py reads the key from API_KEY, not GOOGLE_API_KEY;
+        # GOOGLE_GEMINI_BASE_URL points it elsewhere, e.g. at mock_server.py
+        base_url = os.environ.get("GOOGLE_GEMINI_BASE_URL")
+        self.client = genai.Client(api_key=os.environ["API_KEY"], http_options={"base_url": base_url} if base_url else None)
+
+    def build_request(self, system, user, history=()):
+        # Gemini gets the system and user prompts as a single content string
+        request = {"model": self.model, "contents": "{} {}".format(system, user)}
+        if history:
+            turns = conversation(user, history, first=lambda scenario: "{} {}".format(system, scenario))
+            request["contents"] = [
+                {"role": "user" if role == "user" else "model", "parts": [{"text": text}]} for role, text in turns
+            ]
+        config = {}
+        if self.max_tokens:
+            config["max_output_tokens"] = self.max_tokens
+        if self.request_samples > 1:
+            config["candidate_count"] = self.request_samples
+        if config:
+            request["config"] = config
+        return request
+
+    async def complete(self, request):
+        response = await self.client.aio.models.generate_content(**request)
+        usage = response.usage_metadata
+        if len(response.candidates or []) > 1:
+            # response.text only reads the first candidate, with a warning about the others
+            samples = [
+                "".join(part.text for part in (candidate.content.parts if candidate.content else None) or [] if part.text and not part.thought)
+                for candidate in response.candidates
+            ]
+            text = samples[0]
+        else:
+            text, samples = response.text, None
+        return Completion(
+            text,
+            usage.prompt_token_count if usage else None,
+            usage.candidates_token_count if usage else None,
+            cached_tokens=usage.cached_content_token_count if usage else None,
+            samples=samples,
+        )
+
+    async def stream(self, request):
+        chunks = await self.client.aio.models.generate_content_stream(**request)
+        try:
+            async for response in chunks:
+                usage = response.usage_metadata
+                yield Completion(
+                    response.text or "",
+                    usage.prompt_token_count if usage else None,
+                    usage.candidates_token_count if usage else None,
+                    cached_tokens=usage.cached_content_token_count if usage else None,
+                )
+        finally:
+            await chunks.aclose()
+
+    def retry_after(self, exc):
+        retry_after = super().retry_after(exc)
+        if retry_after == 0:
+            # Gemini puts the delay in a google.rpc.RetryInfo detail of the error body
+            for detail in (getattr(exc, "details", None) or {}).get("error", {}).get("details", []):
+                if "retryDelay" in detail:
+                    return parse_duration(detail["retryDelay"]) or 0
+        return retry_after
+
+
+class OllamaAdapter(ProviderAdapter):
+    """A local Ollama server, which answers up to OLLAMA_NUM_PARALLEL requests at once.
+
+    `connections` keep-alive HTTP connections are pooled, one per request in flight.
+    keep_alive keeps the model loaded between requests; num_ctx (context size, part
+    of the request) and num_thread (CPU threads) are Ollama options left to the
+    server when None.
+    """
+
+    name = "ollama"
+
+    def __init__(self, model, legacy=False, keep_alive="30m", num_ctx=None, num_thread=None, connections=8, **options):
+        super().__init__(model, **options)
+        ollama = _import_sdk("ollama", "ollama")
+        import httpx
+        self.client = ollama.AsyncClient(
+            limits=httpx.Limits(max_connections=connections, max_keepalive_connections=connections, keepalive_expiry=None)
+        )
+        self.legacy = legacy
+        self.keep_alive = keep_alive
+        self.num_ctx = num_ctx
+        self.num_thread = num_thread
+        # totals of the durations (ns) Ollama reports with every answer
+        self.answers = 0
+        self.prompt_tokens = self.prompt_ns = 0
+        self.output_tokens = self.output_ns = 0
+
+    def build_request(self, system, user, history=()):
+        turns = conversation(user, history, first=lambda scenario: "{}. Please, choose case 1 or case 2".format(scenario))
+        messages = [{"role": role, "content": text} for role, text in turns]
+        if self.legacy:
+            # the published runs built one dict with duplicate keys, so only the
+            # user message (and no system prompt) was ever sent
+            request = {"model": self.model, "messages": messages}
+        else:
+            request = {
+                "model": self.model,
+                "messages": [{"role": "system", "content": "There are two theorethical scenarios. {}".format(system)}] + messages,
+            }
+        options = {"num_ctx": self.num_ctx, "num_predict": self.max_tokens}
+        if any(options.values()):
+            request["options"] = {key: value for key, value in options.items() if value}
+        return request
+
+    def _chat(self, request, stream=False):
+        # keep_alive and num_thread change how fast, not what, the model answers,
+        # so they stay out of the request (and its response-cache key)
+        options = dict(request.get("options") or {})
+        if self.num_thread:
+            options["num_thread"] = self.num_thread
+        return self.client.chat(**dict(request, options=options or None), keep_alive=self.keep_alive, stream=stream)
+
+    def _completion(self, response):
+        if response.get("done"):
+            self.answers += 1
+            self.prompt_tokens += response.get("prompt_eval_count") or 0
+            self.prompt_ns += response.get("prompt_eval_duration") or 0
+            self.output_tokens += response.get("eval_count") or 0
+            self.output_ns += response.get("eval_duration") or 0
+        return Completion(response["message"]["content"], response.get("prompt_eval_count"), response.get("eval_count"))
+
+    async def complete(self, request):
+        return self._completion(await self._chat(request))
+
+    async def stream(self, request):
+        chunks = await self._chat(request, stream=True)
+        try:
+            async for chunk in chunks:
+                yield self._completion(chunk)
+        finally:
+            await chunks.aclose()
+
+    def summary(self, seconds):
+        if not self.answers:
+            return None
+        return (
+            "Ollama: {} answers, {:.1f} output tokens/s over the run ({:.1f} per request while generating),"
+            " prompts read at {:.1f} tokens/s".format(
+                self.answers,
+                self.output_tokens / seconds if seconds else 0,
+                self.output_tokens / (self.output_ns / 1e9) if self.output_ns else 0,
+                self.prompt_tokens / (self.prompt_ns / 1e9) if self.prompt_ns else 0,
+            )
+        )
+
+    async def aclose(self):
+        # ollama.AsyncClient has no close(); its httpx client holds the pooled connections
+        await self.client._client.aclose()
+
+
+PROVIDERS = {
+    "openai": OpenAIAdapter,
+    "anthropic": AnthropicAdapter,
+    "google": GoogleAdapter,
+    "ollama": OllamaAdapter,
+}
+
+
+def make_adapter(provider, args):
+    options = {"max_tokens": args.max_tokens, "stream": args.stream, "stop_after": args.stop_after, "samples": args.samples}
+    if provider == "ollama":
+        return OllamaAdapter(
+            args.model,
+            legacy=args.prompt_format == "legacy",
+            keep_alive=args.keep_alive,
+            num_ctx=args.num_ctx,
+            num_thread=args.num_thread,
+            connections=args.concurrency,
+            **options
+        )
+    if provider == "anthropic":
+        return AnthropicAdapter(args.model, legacy=args.prompt_format == "legacy", **options)
+    return PROVIDERS[provider](args.model, **options)
+
+
+## Prompts ##########
+def legacy_prompt(text, row, max_colwidth):
+    """What the published runs sent for `text`, row `row` of a one-column prompt file:
+    "{}".format(df.iloc[row].astype(str)) with display.max_colwidth = max_colwidth."""
+    with pd.option_context("display.max_colwidth", max_colwidth):
+        return "{}".format(pd.Series([text], index=["0"], name=row).astype(str))
+
+
+def load_prompts(dataset, prompt_format="legacy", max_colwidth=700, nb_scenarios=None):
+    """Prompts of the first nb_scenarios (default: all) scenarios of a Stage 1 dataset."""
+    df_system_content, df_user_content = load_prompt_frames(dataset)
+    n = len(df_user_content) if nb_scenarios is None else min(nb_scenarios, len(df_user_content))
+    system_texts = df_system_content.iloc[:n, 0].astype(str).tolist()
+    user_texts = df_user_content.iloc[:n, 0].astype(str).tolist()
+
+    prompts = []
+    for row, (system, user) in enumerate(zip(system_texts, user_texts)):
+        if prompt_format == "legacy":
+            prompts.append(Prompt(row + 1, legacy_prompt(system, row, max_colwidth), legacy_prompt(user, row, max_colwidth), user_text=user, system_text=system))
+        else:
+            prompts.append(Prompt(row + 1, system, user))
+    return prompts
+
+
+def until_converged(prompts, estimator, ci_width, min_scenarios=0):
+    """Yield prompts until the AMCE estimates of `estimator` (an amce.AmceEstimator) have converged.
+
+    run_prompts() draws a prompt only when it is about to send it, so the check
+    is made with every answer received so far.
+    """
+    for prompt in prompts:
+        if estimator.converged(ci_width, min_scenarios):
+            return
+        yield prompt
+
+
+def prefix_schedule(prompts):
+    """(leaders, rest): the first prompt of every system prompt, then all the others.
+
+    Requests start with their system prompt, so scenarios that share one share a
+    cacheable prefix. The leaders are sent first, so that each prefix is in the
+    provider's cache before the rest of its group arrives; the rest are grouped by
+    system prompt, in order of first appearance, to keep that cache warm.
+
+    Prompts are grouped by the dataset's system prompt. The legacy format
+    renders it with the row number, so no two legacy requests share the prefix:
+    only --prompt_format text gets the provider's prompt cache to serve it.
+    """
+    groups = {}
+    for prompt in prompts:
+        groups.setdefault(prompt.system_text or prompt.system, []).append(prompt)
+    leaders = [group[0] for group in groups.values()]
+    rest = [prompt for group in groups.values() for prompt in group[1:]]
+    return leaders, rest
+
+
+def cache_key(adapter, prompt, sample=0):
+    """Response-cache key of one request for `prompt` (sample number `sample` of --samples).
+
+    The request is keyed as built from the dataset's prompts: the legacy format
+    renders them with their row number, which would keep identical scenarios
+    from sharing an answer. Legacy requests are marked as such instead, with the
+    max_colwidth that truncates them, so they never share one with text requests.
+    """
+    keyed = dict(adapter.build_request(prompt.system_text or prompt.system, prompt.user_text or prompt.user, prompt.history))
+    if prompt.system_text is not None or prompt.user_text is not None:
+        keyed["legacy_max_colwidth"] = adapter.legacy_max_colwidth
+    # an answer cut short by --stop_after must not stand in for a full one, or vice
+    # versa, nor one sample for another; the first sample is cached as a single answer
+    if adapter.stop_after is not None:
+        keyed["stop_after"] = adapter.stop_after
+    if sample:
+        keyed["sample"] = sample
+    return request_key(adapter.name, keyed)
+
+
+def cached_completion(row):
+    """Completion of a ResponseCache row."""
+    text, input_tokens, output_tokens, samples = row
+    return Completion(text, input_tokens, output_tokens, samples=samples)
+
+
+def combine_samples(completions):
+    """One Completion of the answers to the separate requests of --samples."""
+    def total(counts):
+        counts = list(counts)
+        return None if None in counts else sum(counts)
+
+    return Completion(
+        completions[0].text,
+        total(completion.input_tokens for completion in completions),
+        total(completion.output_tokens for completion in completions),
+        completions[-1].headers,
+        total(completion.cached_tokens for completion in completions),
+        [completion.text for completion in completions],
+        total(completion.cache_write_tokens for completion in completions),
+    )
+
+
+## Running ##########
+async def query(adapter, prompt, limiter, policy, cache=None, pool=None, telemetry=None):
+    """Completion of one prompt: from `cache` if it holds the request, else sent() and cached.
+
+    With more --samples than one request answers (see ProviderAdapter.request_samples),
+    one request per sample is sent at once, and their answers are combined.
+    """
+    if adapter.samples <= adapter.request_samples:
+        return await query_sample(adapter, prompt, limiter, policy, cache, pool, telemetry)
+    tasks = [
+        asyncio.ensure_future(query_sample(adapter, prompt, limiter, policy, cache, pool, telemetry, sample))
+        for sample in range(adapter.samples)
+    ]
+    try:
+        return combine_samples(await asyncio.gather(*tasks))
+    finally:
+        # the other samples, once one has failed
+        for task in tasks:
+            task.cancel()
+
+
+async def query_sample(adapter, prompt, limiter, policy, cache=None, pool=None, telemetry=None, sample=0):
+    """Completion of one request for a prompt (sample number `sample` of --samples), from `cache` or sent()."""
+    request = adapter.build_request(prompt.system, prompt.user, prompt.history)
+    if cache is None:
+        return await send(adapter, request, prompt, limiter, policy, pool, telemetry)
+
+    key = cache_key(adapter, prompt, sample)
+
+    sent = []
+
+    async def send_and_store():
+        sent.append(True)
+        completion = await send(adapter, request, prompt, limiter, policy, pool, telemetry)
+        cache.put(key, adapter.name, adapter.model, completion.text, completion.input_tokens, completion.output_tokens, completion.samples)
+        return completion
+
+    completion = await cache.fetch(key, send_and_store)
+    if not sent:
+        completion = cached_completion(completion)
+    if telemetry is not None and not sent:
+        telemetry.record(prompt.scenario_id, adapter.name, adapter.model, "cache", attempts=0,
+                         input_tokens=completion.input_tokens, output_tokens=completion.output_tokens)
+    return completion
+
+
+async def send(adapter, request, prompt, limiter, policy, pool=None, telemetry=None):
+    """Completion of one build_request(), sent through `limiter` under the retry_policy.RetryPolicy `policy`.
+
+    Rate-limit errors pause the limiter for the provider's retry-after (or the
+    policy's retry_delay) and are sent again without counting as a retry, up to
+    policy.max_rate_limited times;
+    retryable errors are retried policy.max_retries times after a jittered
+    backoff; fatal errors and a passed deadline are raised. `pool`, a semaphore
+    shared by every model of the provider (see provider_pool()), caps the requests
+    in flight to the provider as a whole. The answer, its timings and its retries
+    are recorded to `telemetry`.
+    """
+    estimated_tokens = limiter.estimate_tokens(prompt.system + prompt.user + "".join(turn for turns in prompt.history for turn in turns))
+    loop = asyncio.get_running_loop()
+    started = loop.time()
+    attempts = retries = rate_limited = 0
+
+    async def attempt(on_sent):
+        nonlocal attempts
+        await limiter.acquire(estimated_tokens)
+        async with pool or contextlib.nullcontext():
+            on_sent()
+            attempts += 1
+            sent = loop.time()
+            first_token = []
+            if adapter.stream_answers:
+                answer = read_stream(adapter, request, adapter.stop_after, on_first_token=lambda: first_token.append(loop.time() - sent))
+            else:
+                answer = adapter.complete(request)
+            completion = await asyncio.wait_for(answer, policy.timeout)
+        latency = loop.time() - sent
+        policy.record_latency(latency)
+        return completion, latency, first_token[0] if first_token else None
+
+    while True:
+        time_left = policy.time_left(loop.time() - started)
+        if time_left is not None and time_left <= 0:
+            raise TimeoutError("Scenario # {}: no answer within the {}s deadline".format(prompt.scenario_id, policy.deadline))
+        try:
+            completion, latency, ttft = await asyncio.wait_for(policy.hedged(attempt), time_left)
+        except Exception as e:
+            kind = classify(e)
+            if kind == RATE_LIMITED:
+                rate_limited += 1
+                if rate_limited > policy.max_rate_limited:
+                    raise
+                limiter.on_rate_limited(adapter.retry_after(e) or policy.retry_delay)
+                tqdm.write("Scenario # {}: rate limited, {} requests in flight from now on".format(prompt.scenario_id, limiter.concurrency))
+                continue
+            retries += 1
+            if kind == FATAL or retries > policy.max_retries:
+                raise
+            delay = policy.backoff(retries)
+            tqdm.write("Scenario # {}: {!r}, retry {} of {} in {:.1f}s".format(prompt.scenario_id, e, retries, policy.max_retries, delay))
+            await asyncio.sleep(delay)
+        else:
+            limiter.on_success(estimated_tokens, completion.input_tokens, completion.output_tokens, completion.headers)
+            if telemetry is not None:
+                telemetry.record(
+                    prompt.scenario_id, adapter.name, adapter.model, "api", latency, ttft, loop.time() - started,
+                    attempts, retries, rate_limited, completion.input_tokens, completion.output_tokens, completion.cached_tokens,
+                    completion.cache_write_tokens,
+                )
+            return completion
+
+
+async def read_stream(adapter, request, stop_after=None, on_first_token=None):
+    """Completion of one request read through adapter.stream().
+
+    With stop_after, the stream is closed once stop_after more tokens (about 4
+    characters each) have arrived after amce.decision() first finds the case
+    the answer chose, and the provider stops generating. The answer so far is
+    checked whenever a sentence of it ends. Output tokens the provider had no
+    chance to report are then estimated from the text. on_first_token() is called
+    when the first text arrives.
+    """
+    text = ""
+    input_tokens = output_tokens = headers = cached_tokens = cache_write_tokens = None
+    decided_at = None
+    pieces = adapter.stream(request)
+    try:
+        async for piece in pieces:
+            if piece.text and not text and on_first_token is not None:
+                on_first_token()
+            text += piece.text
+            input_tokens = piece.input_tokens if piece.input_tokens is not None else input_tokens
+            output_tokens = piece.output_tokens if piece.output_tokens is not None else output_tokens
+            headers = piece.headers if piece.headers is not None else headers
+            cached_tokens = piece.cached_tokens if piece.cached_tokens is not None else cached_tokens
+            cache_write_tokens = piece.cache_write_tokens if piece.cache_write_tokens is not None else cache_write_tokens
+            if stop_after is None or not piece.text:
+                continue
+            if decided_at is None and SENTENCE_END.search(piece.text) and decision(text):
+                decided_at = len(text)
+            if decided_at is not None and (len(text) - decided_at) / 4 >= stop_after:
+                output_tokens = max(output_tokens or 0, len(text) // 4)
+                break
+    finally:
+        await pieces.aclose()
+    return Completion(text, input_tokens, output_tokens, headers, cached_tokens, cache_write_tokens=cache_write_tokens)
+
+
+async def run_prompts(adapter, prompts, concurrency=8, policy=None, limiter=None, cache=None, on_done=None, pool=None, telemetry=None):
+    """Yield (prompt, completion) in prompt order, with at most `concurrency` requests in flight.
+
+    Within that, `limiter` (by default one without quotas) sets how many are in
+    flight; cached answers (see query()) do not count against it. `policy`
+    (by default RetryPolicy()) sets how failed requests are retried, and every
+    answer is recorded to `telemetry` (a telemetry.Telemetry), if given. Answers that
+    arrive ahead of a slower earlier one are held back; at most 4 * concurrency
+    of them, after which no new request is sent until it returns. on_done(prompt,
+    completion), if given, is called as soon as each answer arrives.
+    """
+    if limiter is None:
+        limiter = RateLimiter(max_concurrency=concurrency)
+    if policy is None:
+        policy = RetryPolicy()
+    prompts = iter(prompts)
+    window = 4 * concurrency
+    running = {}
+    done = {}
+    next_index = 0
+    next_yield = 0
+    exhausted = False
+
+    try:
+        while True:
+            while not exhausted and len(running) < limiter.concurrency and next_index - next_yield < window:
+                prompt = next(prompts, None)
+                if prompt is None:
+                    exhausted = True
+                    break
+                task = asyncio.ensure_future(query(adapter, prompt, limiter, policy, cache, pool, telemetry))
+                running[task] = (next_index, prompt)
+                next_index += 1
+
+            if next_yield in done:
+                yield done.pop(next_yield)
+                next_yield += 1
+                continue
+            if not running:
+                return
+
+            finished, _ = await asyncio.wait(running, return_when=asyncio.FIRST_COMPLETED)
+            for task in finished:
+                index, prompt = running.pop(task)
+                done[index] = (prompt, task.result())
+                if on_done is not None:
+                    on_done(*done[index])
+    finally:
+        for task in running:
+            task.cancel()
+
+
+_pools = {}
+
+
+def provider_pool(provider, size):
+    """The semaphore shared by every model of `provider` in this process (size fixed by the first call)."""
+    if provider not in _pools:
+        _pools[provider] = asyncio.Semaphore(size)
+    return _pools[provider]
+
+
+def batch_custom_id(scenario_id):
+    return "scenario-{}".format(scenario_id)
+
+
+async def run_batches(adapter, prompts, on_done, batch_log, cache=None, resumed_batches=(), batch_size=10000, poll_interval=30, telemetry=None):
+    """Answer prompts through the provider's batch API; returns {scenario_id: error} of failed requests.
+
+    Cached answers are used first. The jobs of `resumed_batches` (batch_log records
+    of an earlier run) are collected next; what is still unanswered is then
+    submitted in jobs of at most batch_size requests, each logged to batch_log
+    before it is polled every poll_interval seconds. on_done(prompt, completion)
+    is called for every answer, which is also recorded to `telemetry`, if given.
+    """
+    if not adapter.supports_batch:
+        raise ValueError("--batch is not available for {}".format(adapter.name))
+    if adapter.samples > adapter.request_samples:
+        raise ValueError("--samples with --batch needs a provider that answers them in one request, not {}".format(adapter.name))
+    unanswered = {batch_custom_id(prompt.scenario_id): prompt for prompt in prompts}
+    requests = {custom_id: adapter.build_request(prompt.system, prompt.user, prompt.history) for custom_id, prompt in unanswered.items()}
+    failed = {}
+
+    def deliver(custom_id, completion, store=True):
+        prompt = unanswered.pop(custom_id, None)
+        if prompt is None:
+            # answered already, or not part of this run
+            return
+        failed.pop(custom_id, None)
+        if cache is not None and store:
+            cache.put(cache_key(adapter, prompt), adapter.name, adapter.model, completion.text, completion.input_tokens, completion.output_tokens, completion.samples)
+        if telemetry is not None:
+            telemetry.record(
+                prompt.scenario_id, adapter.name, adapter.model, "batch" if store else "cache", attempts=int(store),
+                input_tokens=completion.input_tokens, output_tokens=completion.output_tokens, cached_tokens=completion.cached_tokens,
+                cache_write_tokens=completion.cache_write_tokens,
+            )
+        on_done(prompt, completion)
+
+    async def collect(batch_ids):
+        pending = set(batch_ids)
+        while pending:
+            for batch_id in sorted(pending):
+                ended, processed = await adapter.batch_status(batch_id)
+                if not ended:
+                    continue
+                for custom_id, result in (await adapter.batch_results(batch_id)).items():
+                    if isinstance(result, str):
+                        if custom_id in unanswered:
+                            failed[custom_id] = result
+                    else:
+                        deliver(custom_id, result)
+                pending.discard(batch_id)
+            if pending:
+                await asyncio.sleep(poll_interval)
+
+    if cache is not None:
+        for custom_id, prompt in list(unanswered.items()):
+            row = cache.get(cache_key(adapter, prompt))
+            if row is not None:
+                cache.hits += 1
+                deliver(custom_id, cached_completion(row), store=False)
+
+    await collect([
+        batch["batch_id"] for batch in resumed_batches
+        if any(batch_custom_id(scenario_id) in unanswered for scenario_id in batch["scenario_ids"])
+    ])
+
+    # everything else, including requests that failed in a resumed job, goes in new jobs
+    remaining = list(unanswered)
+    if remaining and cache is not None:
+        if cache.read_only:
+            raise CacheMiss("{} requests are not in {}".format(len(remaining), cache.path))
+        cache.misses += len(remaining)
+    batch_ids = []
+    for start in range(0, len(remaining), batch_size):
+        chunk = remaining[start:start + batch_size]
+        batch_id = await adapter.submit_batch([(custom_id, requests[custom_id]) for custom_id in chunk])
+        batch_log.append({
+            "batch_id": batch_id,
+            "provider": adapter.name,
+            "model": adapter.model,
+            "scenario_ids": [unanswered[custom_id].scenario_id for custom_id in chunk],
+        })
+        batch_log.sync()
+        tqdm.write("Submitted batch {} ({} requests)".format(batch_id, len(chunk)))
+        batch_ids.append(batch_id)
+    await collect(batch_ids)
+
+    return {unanswered[custom_id].scenario_id: error for custom_id, error in failed.items() if custom_id in unanswered}
+
+
+def scenarios_path(odataset):
+    """The scenarios_*.csv written next to --odataset."""
+    odataset_base = odataset[:-4] if odataset.endswith(".csv") else odataset
+    if "responses" not in os.path.basename(odataset_base):
+        # never the answers file itself
+        return odataset_base + "_scenarios.csv"
+    return odataset_base.replace("responses", "scenarios", 1) + ".csv"
+
+
+def journal_record(adapter, prompt, completion):
+    record = {
+        "scenario_id": prompt.scenario_id,
+        "provider": adapter.name,
+        "model": adapter.model,
+        "text": completion.text,
+        "input_tokens": completion.input_tokens,
+        "output_tokens": completion.output_tokens,
+        "cached_tokens": completion.cached_tokens,
+    }
+    if completion.samples is not None:
+        record["samples"] = completion.samples
+    return record
+
+
+def prompt_cache_summary(records):
+    """How much of the input the provider read from its prompt cache, for journal records; None if it never said."""
+    reported = [record for record in records if record.get("cached_tokens") is not None]
+    if not reported:
+        return None
+    hits = sum(1 for record in reported if record["cached_tokens"])
+    cached = sum(record["cached_tokens"] for record in reported)
+    total = sum(record["input_tokens"] or 0 for record in reported)
+    return "Prompt cache: {} of {} requests hit, {} of {} input tokens ({:.0%}) read from the provider's cache".format(
+        hits, len(reported), cached, total, cached / total if total else 0
+    )
+
+
+async def run_target(provider, args, label=None, position=None, pool=None):
+    """Query every scenario of args.dataset with one of PROVIDERS and write args.odataset.
+
+    `label` and `position` place the progress bar when several targets run at once
+    (see run_targets.py); `pool` is their shared provider_pool().
+    """
+    if args.samples < 1:
+        raise ValueError("--samples must be at least 1")
+    adapter = make_adapter(provider, args)
+    prompts = load_prompts(args.dataset, args.prompt_format, adapter.legacy_max_colwidth, args.nb_scenarios)
+    classified = None
+    if args.followup:
+        if args.adaptive:
+            raise ValueError("--adaptive does not apply to --followup")
+        classified = read_classified(args.followup)
+        prompts = followup_prompts(prompts, classified, args.followup_prompt)
+        print("Follow-up: {} of the {} answers of {} are Case 0".format(len(prompts), len(classified), args.followup))
+
+    path = journal_path(args.odataset)
+    finished = read_journal(path) if args.resume else {}
+    models = {(record["provider"], record["model"]) for record in finished.values()}
+    if models - {(adapter.name, adapter.model)}:
+        raise ValueError("{} holds answers of {}, not {} {}".format(path, sorted(models), adapter.name, adapter.model))
+    todo = [prompt for prompt in prompts if prompt.scenario_id not in finished]
+    if finished:
+        print("Resuming: {} scenarios already answered, {} to go".format(len(prompts) - len(todo), len(todo)))
+
+    estimator = None
+    if args.adaptive:
+        if args.batch:
+            raise ValueError("--adaptive does not apply to --batch")
+        scenario_info = load_scenario_info(args.dataset)
+        estimator = AmceEstimator()
+        for scenario_id, record in finished.items():
+            estimator.add(scenario_info[scenario_id - 1], majority(sample_texts(record)))
+        order = stratified_order([scenario_info[prompt.scenario_id - 1]["scenario_dimension"] for prompt in todo], args.order_seed)
+        todo = [todo[i] for i in order]
+
+    cache = None
+    if args.cache:
+        cache = ResponseCache(args.cache, int(args.cache_size_mb * 1024 * 1024), read_only=args.replay)
+    elif args.replay:
+        raise ValueError("--replay needs --cache")
+
+    journal = Journal(path, resume=args.resume, fsync_every=args.fsync_every)
+    batch_log = None
+    failed = {}
+    progress = tqdm(total=len(prompts), initial=len(prompts) - len(todo), desc=label, position=position)
+    started = time.monotonic()
+    policy = RetryPolicy(args.max_retries, args.retry_delay, args.max_retry_delay, args.timeout, args.deadline, args.hedge, max_rate_limited=args.max_rate_limited)
+    telemetry = Telemetry(journal_path(args.odataset, TELEMETRY_SUFFIX), args.metrics or journal_path(args.odataset, METRICS_SUFFIX))
+
+    def on_done(prompt, completion):
+        record = journal_record(adapter, prompt, completion)
+        journal.append(record)
+        finished[prompt.scenario_id] = record
+        if estimator is not None:
+            estimator.add(scenario_info[prompt.scenario_id - 1], majority(sample_texts(record)))
+            attribute, width = estimator.widest()
+            progress.set_postfix_str("widest CI {:.3f} ({})".format(width, attribute), refresh=False)
+        progress.update()
+
+    try:
+        if args.batch:
+            if adapter.stream_answers:
+                raise ValueError("--stream and --stop_after do not apply to --batch")
+            batch_log_path = journal_path(args.odataset, BATCH_LOG_SUFFIX)
+            resumed_batches = list(read_records(batch_log_path)) if args.resume else []
+            batch_log = Journal(batch_log_path, resume=args.resume)
+            leaders, rest = prefix_schedule(todo)
+            failed = await run_batches(adapter, leaders + rest, on_done, batch_log, cache, resumed_batches, args.batch_size, args.poll_interval, telemetry)
+        else:
+            # --concurrency counts requests, and a scenario sent as one request per sample takes several
+            concurrency = max(1, args.concurrency // (adapter.samples // adapter.request_samples))
+            limiter = rate_limiter(provider, args.model, args.rpm, args.tpm, concurrency)
+            parts = prefix_schedule(todo)
+            if estimator is not None:
+                # the leaders still go first, but the rest keep their stratified order
+                leaders = {prompt.scenario_id for prompt in parts[0]}
+                parts = (parts[0], [prompt for prompt in todo if prompt.scenario_id not in leaders])
+            for part in parts:
+                if estimator is not None:
+                    part = until_converged(part, estimator, args.ci_width, args.min_scenarios)
+                async for _ in run_prompts(adapter, part, concurrency, policy, limiter, cache, on_done, pool, telemetry):
+                    pass
+    finally:
+        progress.close()
+        telemetry.close()
+        summaries = (telemetry.summary(), prompt_cache_summary(finished.values()), adapter.summary(time.monotonic() - started), policy.summary())
+        for summary in summaries:
+            if summary:
+                tqdm.write("{}: {}".format(label, summary) if label else summary)
+        journal.close()
+        if batch_log is not None:
+            batch_log.close()
+        await adapter.aclose()
+        if cache is not None:
+            summary = "Response cache: {} hits, {} misses".format(cache.hits, cache.misses)
+            tqdm.write("{}: {}".format(label, summary) if label else summary)
+            cache.close()
+
+    if failed:
+        scenario_id, error = next(iter(sorted(failed.items())))
+        raise RuntimeError("{} scenarios have no answer (Scenario # {}: {}); rerun with --resume to submit them again".format(len(failed), scenario_id, error))
+
+    if adapter.samples > 1:
+        records = [finished[scenario_id] for scenario_id in sorted(finished)]
+        sample_table(records).to_csv(journal_path(args.odataset, SAMPLES_SUFFIX), index=False)
+        votes = vote_table(records)
+        votes.to_csv(journal_path(args.odataset, VOTES_SUFFIX), index=False)
+        summary = vote_summary(votes)
+        if summary:
+            tqdm.write("{}: {}".format(label, summary) if label else summary)
+
+    if classified is not None:
+        merged = merge_followup(classified, {scenario_id: record["text"] for scenario_id, record in finished.items()})
+        merged.to_csv(args.odataset, index=False)
+        decided = int(((merged["Round"] == 2) & merged["Case"].isin([1, 2])).sum())
+        summary = "Follow-up: {} of {} Case 0 answers decided in round 2".format(decided, len(prompts))
+        tqdm.write("{}: {}".format(label, summary) if label else summary)
+        return
+
+    if estimator is not None:
+        # an adaptive run stops early: only the scenarios answered are written
+        prompts = [prompt for prompt in prompts if prompt.scenario_id in finished]
+        attribute, width = estimator.widest()
+        summary = "Adaptive run: {} scenarios answered, widest 95% CI {:.3f} ({}), target {}\n{}".format(
+            len(prompts), width, attribute, args.ci_width, estimator.summary()
+        )
+        tqdm.write("{}: {}".format(label, summary) if label else summary)
+        estimates = [(attribute,) + (estimate or (None, None, None)) for attribute, estimate in estimator.estimates().items()]
+        pd.DataFrame(estimates, columns=["attribute", "delta", "ci_low", "ci_high"]).to_csv(journal_path(args.odataset, AMCE_SUFFIX), index=False)
+
+    responses_list = ["Scenario # " + str(prompt.scenario_id) + ": " + finished[prompt.scenario_id]["text"] for prompt in prompts]
+    pd.DataFrame(responses_list).to_csv(args.odataset, sep="|", index=False)
+    pd.DataFrame([prompt.user_text or prompt.user for prompt in prompts]).to_csv(scenarios_path(args.odataset), sep="|", index=False)
+
+
+def add_runner_arguments(parser):
+    """Options shared by every run_*.py script."""
+    parser.add_argument('--concurrency', default='8', type=int, help='most requests in flight at once (halved on rate-limit errors, then grown back)')
+    parser.add_argument('--rpm', default=None, type=int, help='requests per minute allowed (default: learned from the rate-limit headers)')
+    parser.add_argument('--tpm', default=None, type=int, help='tokens per minute allowed (default: learned from the rate-limit headers)')
+    parser.add_argument('--nb_scenarios', default=None, type=int, help='query only the first N scenarios (default: all)')
+    parser.add_argument('--prompt_format', default='legacy', choices=PROMPT_FORMATS, help='legacy: the pandas row repr the published runs sent; text: the prompt itself (not the published requests)')
+    parser.add_argument('--max_retries', default='5', type=int, help='retries of a failed request (rate-limit errors not counted)')
+    parser.add_argument('--max_rate_limited', default='20', type=int, help='rate-limit errors after which a scenario fails')
+    parser.add_argument('--retry_delay', default='2', type=float, help='backoff before the first retry, doubled for each further one (with jitter)')
+    parser.add_argument('--max_retry_delay', default='60', type=float, help='longest backoff between retries')
+    parser.add_argument('--timeout', default='300', type=float, help='seconds before one attempt is abandoned and retried')
+    parser.add_argument('--deadline', default=None, type=float, help='seconds after which a scenario fails, retries included (default: none)')
+    parser.add_argument('--max_tokens', default=None, type=int, help='longest answer in tokens (default: the provider\'s; 2000 for Anthropic)')
+    parser.add_argument('--stream', action='store_true', help='read answers as they are generated')
+    parser.add_argument('--stop_after', default=None, type=int, help='with --stream: stop N tokens after the Case 1/Case 2 decision appears (default: read whole answers)')
+    parser.add_argument('--hedge', action='store_true', help='send a duplicate of any request slower than the p95 latency; the first answer wins')
+    parser.add_argument('--cache', default=None, type=str, help='SQLite response cache: answers to unchanged requests are reused')
+    parser.add_argument('--cache_size_mb', default='1024', type=float, help='least recently used answers are evicted past this size')
+    parser.add_argument('--replay', action='store_true', help='answer only from --cache (read-only); a missing answer is an error')
+    parser.add_argument('--resume', action='store_true', help='skip the scenarios already in <odataset>.journal.jsonl')
+    parser.add_argument('--adaptive', action='store_true', help='query in stratified order and stop once every AMCE confidence interval is narrower than --ci_width')
+    parser.add_argument('--ci_width', default='0.25', type=float, help='--adaptive: target width of the 95%% confidence interval of every AMCE')
+    parser.add_argument('--min_scenarios', default='100', type=int, help='--adaptive: decided answers needed before stopping')
+    parser.add_argument('--order_seed', default='0', type=int, help='--adaptive: seed of the stratified scenario order')
+    parser.add_argument('--followup', default=None, type=str, help='classified output: ask its Case 0 scenarios again, after their answer; --odataset gets the merged result')
+    parser.add_argument('--followup_prompt', default=FOLLOWUP_PROMPT, type=str, help='--followup: the follow-up turn')
+    parser.add_argument('--samples', default='1', type=int, help='answers per scenario, in one request for OpenAI (n) and Gemini (candidate_count), else one request each; votes go to <odataset>.votes.csv')
+    parser.add_argument('--batch', action='store_true', help='send every scenario as provider batch jobs (OpenAI Batch API, Anthropic Message Batches)')
+    parser.add_argument('--batch_size', default='10000', type=int, help='requests per batch job')
+    parser.add_argument('--poll_interval', default='30', type=float, help='seconds between batch status checks')
+    parser.add_argument('--metrics', default=None, type=str, help='Prometheus text file of the run\'s metrics (default: <odataset>.prom)')
+    parser.add_argument('--fsync_every', default='50', type=int, help='answers appended to the journal between fsyncs (at most 1s apart)')
+    return parser
+
+
+def add_ollama_arguments(parser):
+    """Options of the Ollama adapter."""
+    parser.add_argument('--keep_alive', default='30m', type=str, help='how long the server keeps the model loaded after a request')
+    parser.add_argument('--num_ctx', default=None, type=int, help='context size in tokens (server default when unset)')
+    parser.add_argument('--num_thread', default=None, type=int, help='CPU threads per request (server default when unset)')
+    return parser
+
+
+def run(provider, args):
+    """Query every scenario of args.dataset with one of PROVIDERS and write args.odataset."""
+    asyncio.run(run_target(provider, args))
@@ -0,0 +1,143 @@
+"""
+Benchmark and regression check for the scenario generator.
+
+Measures the throughput (scenarios/s) and allocations (peak traced memory, and
+memory still held per scenario afterwards) of generate_moral_machine_scenarios(), per
+scenario dimension and per is_in_car/is_interventionism/is_law combination, at
+each --sizes, plus the --batch path of mm_generation.py and its speedup over the
+sequential one.
+
+Before timing anything, it regenerates the scenarios of
+`mm_generation.py --random_seed 123` and compares them byte for byte with the
+shipped Data/ files. A generator change must keep this check passing: the exit
+status is 1 if any file differs.
+
+    python mm_benchmark.py                          # golden check + 10^3, 10^5, 10^6
+    python mm_benchmark.py --sizes 1000 --output bench.csv
+    python mm_benchmark.py --golden_only
+"""
+
+import argparse
+import filecmp
+import os
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+from itertools import product
+
+import pandas as pd
+
+from config import scenario_dimensions
+from generate_moral_machine_scenarios_robots import generate_moral_machine_scenarios, iter_batch_scenarios, render_group
+from mm_generation import sequential_scenarios
+from scenario_io import CSV_FILES, CsvScenarioWriter
+
+GOLDEN_SEED = 123
+GOLDEN_NB_SCENARIOS = 1000
+# Data/ ships every Stage 1 file except user_content.csv (generated but not used)
+GOLDEN_FILES = [CSV_FILES[key] for key in ("system_content", "user_content_self_conscious", "scenario_info")]
+
+parser = argparse.ArgumentParser(description='Benchmark the scenario generator')
+parser.add_argument('--sizes', default=[10**3, 10**5, 10**6], type=int, nargs='+', help='number of scenarios per measurement')
+parser.add_argument('--alloc_size', default='10000', type=int, help='scenarios traced for allocations (tracemalloc slows generation down)')
+parser.add_argument('--random_seed', default='0', type=int)
+parser.add_argument('--data_dir', default=os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'Data'), type=str)
+parser.add_argument('--golden_only', action='store_true', help='only run the byte-for-byte check against --data_dir')
+parser.add_argument('--skip_golden', action='store_true')
+parser.add_argument('--output', default=None, type=str, help='also write the results to this CSV file')
+
+
+def check_golden(data_dir):
+    """Regenerate the seed-123 scenarios and compare them with data_dir; returns the differing files."""
+    random.seed(GOLDEN_SEED)
+    with tempfile.TemporaryDirectory() as tmp:
+        with CsvScenarioWriter(tmp) as writer:
+            for scenario in sequential_scenarios(GOLDEN_NB_SCENARIOS):
+                writer.write(scenario)
+        return [
+            name for name in GOLDEN_FILES
+            if not filecmp.cmp(os.path.join(tmp, name), os.path.join(data_dir, name), shallow=False)
+        ]
+
+
+def sampled_scenarios(n, dimension=None, flags=None):
+    """n scenarios of one dimension and/or one (is_in_car, is_interventionism, is_law) combination."""
+    for _ in range(n):
+        scenario_dimension = dimension or random.choice(scenario_dimensions)
+        is_in_car, is_interventionism, is_law = flags or (random.choice([True, False]) for _ in range(3))
+        yield generate_moral_machine_scenarios(scenario_dimension, is_in_car, is_interventionism, is_law)
+
+
+def measure(make_scenarios, n, alloc_size):
+    """Throughput of consuming make_scenarios(n), and allocations over make_scenarios(alloc_size).
+
+    Both start from an empty render_group() cache, so no case is timed on phrases
+    an earlier case rendered.
+    """
+    render_group.cache_clear()
+    start = time.perf_counter()
+    for _ in make_scenarios(n):
+        pass
+    elapsed = time.perf_counter() - start
+
+    m = min(n, alloc_size)
+    render_group.cache_clear()
+    tracemalloc.start()
+    for _ in make_scenarios(m):
+        pass
+    # memory still allocated afterwards, e.g. render caches filling up
+    retained, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        "scenarios": n,
+        "seconds": round(elapsed, 3),
+        "scenarios_per_s": round(n / elapsed),
+        "peak_kib": round(peak / 1024, 1),
+        "retained_bytes_per_scenario": round(retained / m, 1),
+    }
+
+
+def benchmarks(seed):
+    """(name, make_scenarios) of every measured configuration; each run is re-seeded."""
+    def seeded(generate):
+        def make_scenarios(n):
+            random.seed(seed)
+            return generate(n)
+        return make_scenarios
+
+    for dimension in scenario_dimensions:
+        yield "dimension={}".format(dimension), seeded(lambda n, d=dimension: sampled_scenarios(n, dimension=d))
+    for flags in product((False, True), repeat=3):
+        name = "is_in_car={} is_interventionism={} is_law={}".format(*flags)
+        yield name, seeded(lambda n, f=flags: sampled_scenarios(n, flags=f))
+    yield "all (sequential)", seeded(sequential_scenarios)
+    yield "all (--batch)", lambda n: iter_batch_scenarios(n, seed)
+
+
+if __name__ == '__main__':
+    args = parser.parse_args()
+
+    if not args.skip_golden:
+        mismatches = check_golden(args.data_dir)
+        if mismatches:
+            print("golden check FAILED: {} differ from --random_seed {}".format(", ".join(mismatches), GOLDEN_SEED))
+            sys.exit(1)
+        print("golden check passed: {} match --random_seed {}".format(", ".join(GOLDEN_FILES), GOLDEN_SEED))
+    if args.golden_only:
+        sys.exit(0)
+
+    results = []
+    for size in args.sizes:
+        for name, make_scenarios in benchmarks(args.random_seed):
+            result = {"benchmark": name}
+            result.update(measure(make_scenarios, size, args.alloc_size))
+            results.append(result)
+            print("{benchmark:<55} {scenarios:>9} {scenarios_per_s:>9}/s {peak_kib:>9} KiB peak {retained_bytes_per_scenario:>7} B/scenario retained".format(**result), flush=True)
+        rates = {result["benchmark"]: result["scenarios_per_s"] for result in results if result["scenarios"] == size}
+        print("{:<55} {:>9} {:>9.2f}x".format("--batch speedup over sequential", size, rates["all (--batch)"] / rates["all (sequential)"]), flush=True)
+
+    if args.output:
+        pd.DataFrame(results).to_csv(args.output, index=False)
@@ -3,7 +3,8 @@ import random
 from tqdm import tqdm
 import time
 
-from generate_moral_machine_scenarios_robots import generate_moral_machine_scenarios
+from generate_moral_machine_scenarios_robots import generate_moral_machine_scenarios, iter_batch_scenarios, enumerate_scenarios
+from scenario_io import open_scenario_writer, SCENARIO_WRITERS
 
 import argparse
 
@@ -12,37 +13,46 @@ parser = argparse.ArgumentParser(description='Run ChatGPT')
 parser.add_argument('--model', default='gpt-3.5-turbo-0613', type=str)
 parser.add_argument('--nb_scenarios', default='1000', type=int)
 parser.add_argument('--random_seed', default='123', type=int)
-args = parser.parse_args()
-
-random.seed(args.random_seed)
-system_content_list = []
-user_content_list = []
-user_self_conscious_content_list = []
-scenario_info_list = []
-
-for i in tqdm(range(args.nb_scenarios)):
-  # scenario dimension
-  dimension = random.choice(["species", "social_value", "gender", "age", "fitness", "utilitarianism"])
-  # Interventionism #########
-  is_interventionism = random.choice([True, False])
-  # Relationship to vehicle #########
-  is_in_car = random.choice([True, False])
-  # Concern for law #########
-  is_law = random.choice([True, False])
-
-  system_content, user_content, user_content_self_conscious, scenario_info = generate_moral_machine_scenarios(dimension, is_in_car, is_interventionism, is_law)
-  system_content_list.append(system_content)
-  user_content_list.append(user_content)
-  user_self_conscious_content_list.append(user_content_self_conscious)
-  scenario_info_list.append(scenario_info)
-
-df_system = pd.DataFrame(system_content_list)
-df_user = pd.DataFrame(user_content_list)
-df_user_self_conscious = pd.DataFrame(user_self_conscious_content_list)
-df_scenario = pd.DataFrame(scenario_info_list)
-
-df_system.to_csv("system_content.csv", sep="|", index=False)
-df_user.to_csv("user_content.csv", sep="|", index=False)
-df_user_self_conscious.to_csv("user_self_conscious_content.csv", sep="|", index=False)
-df_scenario.to_csv("scenario_info.csv", sep="|", index=False)
+parser.add_argument('--batch', action='store_true', help='sample all scenarios at once with NumPy (not faster on its own, see mm_benchmark.py; a different random stream: does not reproduce the seed-123 paper set)')
+parser.add_argument('--workers', default='0', type=int, help='render --batch blocks in N processes (implies --batch); the output is the same for any N')
+parser.add_argument('--enumerate', action='store_true', help='write every distinct scenario of the full factorial design up to --max_pairs instead of sampling (ignores --nb_scenarios)')
+parser.add_argument('--max_pairs', default='1', type=int, help='largest number of pairs per scenario for --enumerate (5 = the whole design space)')
+parser.add_argument('--format', default='csv', choices=list(SCENARIO_WRITERS), help='csv: the four pipe-separated Stage 1 files; jsonl: scenarios.jsonl; parquet: scenarios/part-*.parquet; arrow: scenarios.arrow, the typed scenario store')
+parser.add_argument('--chunk_size', default='1000', type=int, help='scenarios buffered before each write to disk')
+parser.add_argument('--output_dir', default='.', type=str)
+
+def sequential_scenarios(nb_scenarios):
+  for i in range(nb_scenarios):
+    # scenario dimension
+    dimension = random.choice(["species", "social_value", "gender", "age", "fitness", "utilitarianism"])
+    # Interventionism #########
+    is_interventionism = random.choice([True, False])
+    # Relationship to vehicle #########
+    is_in_car = random.choice([True, False])
+    # Concern for law #########
+    is_law = random.choice([True, False])
+
+    yield generate_moral_machine_scenarios(dimension, is_in_car, is_interventionism, is_law)
+
+# Worker processes re-import this module, so the run itself stays under the main guard
+if __name__ == '__main__':
+  args = parser.parse_args()
+
+  total = args.nb_scenarios
+  if args.enumerate:
+    scenarios = enumerate_scenarios(args.max_pairs)
+    total = None
+  elif args.batch or args.workers > 0:
+    # same design distribution, but NumPy's random stream: not the published scenarios
+    print("--batch: the scenarios are drawn from NumPy's random stream, so --random_seed {} does not give the "
+          "scenario set of the sequential generator (the published Data/ files come from the sequential --random_seed 123)".format(args.random_seed))
+    scenarios = iter_batch_scenarios(args.nb_scenarios, args.random_seed, workers=args.workers)
+  else:
+    random.seed(args.random_seed)
+    scenarios = sequential_scenarios(args.nb_scenarios)
+
+  # Scenarios are streamed to disk every --chunk_size rows
+  with open_scenario_writer(args.format, args.output_dir, args.chunk_size) as writer:
+    for scenario in tqdm(scenarios, total=total):
+      writer.write(scenario)
 
@@ -0,0 +1,768 @@
+"""
+Offline stand-in for the provider APIs used by llm_runner.py.
+
+Serves, on one localhost port, the wire formats the runners speak:
+
+    OpenAI      /v1/chat/completions, and the Batch API (/v1/files, /v1/batches)
+    Anthropic   /v1/messages, and Message Batches (/v1/messages/batches)
+    Gemini      /v1beta/models/{model}:generateContent and :streamGenerateContent
+    Ollama      /api/chat
+
+so that the runners can be run, load tested and benchmarked without keys,
+network or cost. Streamed answers come as the provider's SSE events (NDJSON for
+Ollama), and a client that closes a stream early stops the generation.
+
+Every answer takes a first-token latency drawn from a lognormal distribution
+(median --latency, spread --latency_sigma) plus its output tokens at
+--tokens_per_s. A --error_rate fraction of the requests fail with the provider's
+overload error (500, 529 or 503). --rpm/--tpm limit every model like the
+providers do, continuously refilled per-minute quotas that save up at most
+--burst_seconds of quota, answered with 429s, retry-after and the
+x-ratelimit-*/anthropic-ratelimit-* headers. Ollama answers --num_parallel
+requests at once and queues the rest, like OLLAMA_NUM_PARALLEL. A batch ends
+--batch_delay seconds after it is submitted.
+
+Answers are canned by default: "I choose Case 1. Answer: Case 1" or the same for
+Case 2, picked from a hash of the request, so the same request always gets the
+same answer. OpenAI's n and Gemini's candidateCount get that many answers, the
+first as without them and the others canned from the request and their index.
+--replay serves the answers of a previous run instead: a run_*.py --odataset or
+one of Data/*_classified.csv, read by their "Scenario # N:" prefix. `model=path`
+only replays to that model. The number N of a request is looked up in the
+prompts of --dataset, the file the runner sends; prompts in the legacy format
+carry it themselves. Scenarios without a recorded answer get a canned one.
+
+GET /mock/stats returns the request, error and 429 counts, the peak of requests
+in flight, the streams closed early and the output tokens sent.
+
+    python mock_server.py --port 8765 --latency 2 --tokens_per_s 50 --rpm 500 \
+        --dataset user_self_conscious_content.csv --replay roos2_clean.csv &
+    export OPENAI_BASE_URL=http://127.0.0.1:8765/v1 OPENAI_API_KEY=mock
+    export ANTHROPIC_BASE_URL=http://127.0.0.1:8765 ANTHROPIC_API_KEY=mock
+    export GOOGLE_GEMINI_BASE_URL=http://127.0.0.1:8765 API_KEY=mock
+    export OLLAMA_HOST=http://127.0.0.1:8765
+    python run_OpenAI.py --odataset responses_mock.csv
+    python run_OpenAI.py --batch --poll_interval 1 --odataset responses_mock.csv
+"""
+
+import argparse
+import email.parser
+import hashlib
+import itertools
+import json
+import math
+import random
+import re
+import threading
+import time
+from collections import Counter
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pandas as pd
+
+from scenario_io import load_prompt_frames
+
+parser = argparse.ArgumentParser(description='Offline stand-in for the provider APIs')
+parser.add_argument('--host', default='127.0.0.1', type=str)
+parser.add_argument('--port', default='8765', type=int)
+parser.add_argument('--batch_delay', default='2', type=float, help='seconds before a submitted batch ends')
+parser.add_argument('--error_rate', default='0', type=float, help='fraction of requests (batched or not) that fail')
+parser.add_argument('--latency', default='0', type=float, help='median seconds to the first token')
+parser.add_argument('--latency_sigma', default='0.5', type=float, help='sigma of the lognormal first-token latency')
+parser.add_argument('--tokens_per_s', default='0', type=float, help='output tokens per second of every answer (0: instant)')
+parser.add_argument('--rpm', default=None, type=int, help='requests per minute per model (default: unlimited)')
+parser.add_argument('--tpm', default=None, type=int, help='tokens per minute per model (default: unlimited)')
+parser.add_argument('--burst_seconds', default='1', type=float, help='seconds of --rpm/--tpm quota that can be used at once')
+parser.add_argument('--num_parallel', default='4', type=int, help='Ollama requests answered at once')
+parser.add_argument('--dataset', default=None, type=str, help='the prompts the runner sends, to find the scenario number of a request')
+parser.add_argument('--system_dataset', default='system_content.csv', type=str)
+parser.add_argument('--replay', default=[], nargs='*', help='[model=]answers.csv: answers to replay by "Scenario # N"')
+parser.add_argument('--random_seed', default='0', type=int)
+
+# "Scenario # N: <answer>", the first column of the runners' outputs
+SCENARIO_ANSWER = re.compile(r"Scenario # (\d+): ?(.*)", re.DOTALL)
+# the pandas Series repr of a --prompt_format legacy prompt ends with its row
+LEGACY_ROW = re.compile(r"Name: (\d+), dtype: object")
+
+
+def mock_answer(request):
+    """A fixed answer for a request: Case 1 or Case 2, from a hash of its content."""
+    digest = hashlib.sha256(json.dumps(request, sort_keys=True).encode("utf-8")).digest()
+    return "I choose Case {0}. Answer: Case {0}".format(1 + digest[0] % 2)
+
+
+def _tokens(text):
+    return max(1, len(text) // 4)
+
+
+def _iso(timestamp):
+    return datetime.fromtimestamp(timestamp, timezone.utc).isoformat().replace("+00:00", "Z")
+
+
+def _pieces(text):
+    # streamed about one token (a word and its trailing space) per event
+    return re.findall(r"\s*\S+\s*", text) or [text]
+
+
+def load_answers(path):
+    """{N: answer} of a CSV whose first column holds "Scenario # N: <answer>":
+    a run_*.py --odataset (pipe-separated) or a Data/*_classified.csv."""
+    with open(path, encoding="utf-8") as f:
+        header = f.readline()
+    df = pd.read_csv(path, sep="," if "," in header else "|")
+    answers = {}
+    for cell in df.iloc[:, 0].astype(str):
+        match = SCENARIO_ANSWER.match(cell)
+        if match:
+            answers.setdefault(int(match.group(1)), match.group(2))
+    return answers
+
+
+def load_replay(specs):
+    """{model (None: any model): {N: answer}} of --replay [model=]path entries."""
+    replay = {}
+    for spec in specs:
+        model, _, path = spec.rpartition("=")
+        replay.setdefault(model or None, {}).update(load_answers(path))
+    return replay
+
+
+class ScenarioIndex:
+    """Scenario number of a prompt, looked up in the prompts of the dataset the runner sends."""
+
+    def __init__(self, dataset=None, system_dataset="system_content.csv"):
+        self.numbers = {}
+        self.systems = []
+        if dataset:
+            df_system_content, df_user_content = load_prompt_frames(dataset, system_dataset)
+            for number, text in reversed(list(enumerate(df_user_content.iloc[:, 0].astype(str), 1))):
+                self.numbers[text] = number
+            self.systems = sorted(set(df_system_content.iloc[:, 0].astype(str)), key=len, reverse=True)
+
+    def number(self, text):
+        """N of the scenario whose prompt `text` wraps, or None."""
+        match = LEGACY_ROW.search(text)
+        if match:
+            return int(match.group(1)) + 1
+        # Gemini gets "<system> <user>"; Ollama and legacy Anthropic prompts end
+        # with an instruction after the scenario's last ". "
+        candidates = [text] + [text[len(system) + 1:] for system in self.systems if text.startswith(system + " ")]
+        for candidate in candidates:
+            for scenario in (candidate, candidate.rsplit(". ", 1)[0]):
+                if scenario in self.numbers:
+                    return self.numbers[scenario]
+        return None
+
+
+class Quota:
+    """A per-minute limit, refilled continuously; at most burst_seconds of it can be used at once."""
+
+    def __init__(self, limit, burst_seconds=1):
+        self.limit = limit
+        self.capacity = max(1, limit * burst_seconds / 60)
+        self.level = self.capacity
+        self._updated = time.monotonic()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.level = min(self.capacity, self.level + (now - self._updated) * self.limit / 60)
+        self._updated = now
+
+    def wait_time(self, amount):
+        """Seconds until `amount` can be taken (more than the capacity needs a full quota)."""
+        self._refill()
+        return max(0, (min(amount, self.capacity) - self.level) * 60 / self.limit)
+
+    def take(self, amount):
+        self.level -= amount
+
+    def reset_time(self):
+        """Seconds until the quota is full again."""
+        return max(0, (self.capacity - self.level) * 60 / self.limit)
+
+
+def rate_limit_headers(provider, quotas):
+    """The OpenAI or Anthropic rate-limit headers of a model's quotas."""
+    headers = {}
+    for kind, quota in quotas.items():
+        if quota is None:
+            continue
+        values = {"limit": quota.limit, "remaining": max(0, int(quota.level))}
+        if provider == "openai":
+            values["reset"] = "{:.3f}s".format(quota.reset_time())
+            headers.update({"x-ratelimit-{}-{}".format(field, kind): value for field, value in values.items()})
+        elif provider == "anthropic":
+            values["reset"] = _iso(time.time() + quota.reset_time())
+            headers.update({"anthropic-ratelimit-{}-{}".format(kind, field): value for field, value in values.items()})
+    return headers
+
+
+def error_response(provider, status, retry_after=None):
+    """(body, headers) of a 429 (with retry_after) or an overload error in the provider's format."""
+    headers = {}
+    if status == 429:
+        headers["retry-after"] = str(math.ceil(retry_after))
+        if provider == "openai":
+            headers["retry-after-ms"] = str(int(retry_after * 1000))
+    if provider == "openai":
+        kind = "rate_limit_exceeded" if status == 429 else "server_error"
+        return {"error": {"message": "mock " + kind, "type": kind, "param": None, "code": kind}}, headers
+    if provider == "anthropic":
+        kind = "rate_limit_error" if status == 429 else "overloaded_error"
+        return {"type": "error", "error": {"type": kind, "message": "mock " + kind}}, headers
+    if provider == "google":
+        error = {"code": status, "message": "mock error", "status": "RESOURCE_EXHAUSTED" if status == 429 else "UNAVAILABLE"}
+        if status == 429:
+            error["details"] = [{"@type": "type.googleapis.com/google.rpc.RetryInfo", "retryDelay": "{:.3f}s".format(retry_after)}]
+        return {"error": error}, headers
+    return {"error": "mock error"}, headers
+
+
+def user_text(messages):
+    """Text of the last user message of an OpenAI, Anthropic or Ollama request."""
+    for message in reversed(messages):
+        if message.get("role") == "user":
+            content = message.get("content")
+            if isinstance(content, list):
+                return "".join(block.get("text", "") for block in content)
+            return content or ""
+    return ""
+
+
+def gemini_text(request):
+    return " ".join(part.get("text", "") for content in request.get("contents", []) for part in content.get("parts", []))
+
+
+def openai_completion(request, answer=None):
+    """Chat completion object answering an OpenAI chat request; `answer` is a list with n > 1."""
+    answer = mock_answer(request) if answer is None else answer
+    answers = answer if isinstance(answer, list) else [answer]
+    prompt_tokens = _tokens(json.dumps(request.get("messages", [])))
+    completion_tokens = sum(_tokens(text) for text in answers)
+    return {
+        "id": "chatcmpl-mock",
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": request.get("model", "mock"),
+        "choices": [
+            {"index": index, "finish_reason": "stop", "message": {"role": "assistant", "content": text}}
+            for index, text in enumerate(answers)
+        ],
+        "usage": {"prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens, "total_tokens": prompt_tokens + completion_tokens},
+    }
+
+
+def anthropic_message(request, answer=None):
+    """Message object answering an Anthropic messages request."""
+    answer = mock_answer(request) if answer is None else answer
+    return {
+        "id": "msg_mock",
+        "type": "message",
+        "role": "assistant",
+        "model": request.get("model", "mock"),
+        "content": [{"type": "text", "text": answer}],
+        "stop_reason": "end_turn",
+        "stop_sequence": None,
+        "usage": {"input_tokens": _tokens(json.dumps(request.get("messages", []))), "output_tokens": _tokens(answer)},
+    }
+
+
+def gemini_response(request, model, text, output_tokens, done=True):
+    """GenerateContentResponse of a Gemini request (one chunk of it when streaming); `text` is a list with candidateCount > 1."""
+    prompt_tokens = _tokens(gemini_text(request))
+    candidates = []
+    for index, candidate_text in enumerate(text if isinstance(text, list) else [text]):
+        candidate = {"content": {"parts": [{"text": candidate_text}], "role": "model"}, "index": index}
+        if done:
+            candidate["finishReason"] = "STOP"
+        candidates.append(candidate)
+    return {
+        "candidates": candidates,
+        "usageMetadata": {"promptTokenCount": prompt_tokens, "candidatesTokenCount": output_tokens, "totalTokenCount": prompt_tokens + output_tokens},
+        "modelVersion": model,
+    }
+
+
+def ollama_response(request, content, done=False, output_tokens=0, seconds=0):
+    """One /api/chat answer (or stream line); the last one carries Ollama's counts and durations (ns)."""
+    response = {
+        "model": request.get("model", "mock"),
+        "created_at": _iso(time.time()),
+        "message": {"role": "assistant", "content": content},
+        "done": done,
+    }
+    if done:
+        prompt_tokens = _tokens(json.dumps(request.get("messages", [])))
+        response.update({
+            "done_reason": "stop", "total_duration": int(seconds * 1e9), "load_duration": 0,
+            "prompt_eval_count": prompt_tokens, "prompt_eval_duration": 1000 * prompt_tokens,
+            "eval_count": output_tokens, "eval_duration": int(seconds * 1e9) or 1,
+        })
+    return response
+
+
+class MockState:
+    """Files, batches, quotas and counters of the server, shared by all request threads."""
+
+    def __init__(self, batch_delay=2, error_rate=0, seed=0, latency=0, latency_sigma=0.5, tokens_per_s=0,
+                 rpm=None, tpm=None, burst_seconds=1, num_parallel=4, replay=None, scenarios=None):
+        self.batch_delay = batch_delay
+        self.error_rate = error_rate
+        self.latency = latency
+        self.latency_sigma = latency_sigma
+        self.tokens_per_s = tokens_per_s
+        self.limits = {"requests": rpm, "tokens": tpm}
+        self.burst_seconds = burst_seconds
+        self.random = random.Random(seed)
+        self.lock = threading.RLock()
+        self.ids = itertools.count(1)
+        self.files = {}
+        self.batches = {}
+        self.quotas = {}
+        self.ollama_slots = threading.Semaphore(num_parallel)
+        self.replay = replay or {}
+        self.scenarios = scenarios or ScenarioIndex()
+        self.stats = Counter()
+        self.in_flight = 0
+
+    def new_id(self, prefix):
+        with self.lock:
+            return "{}{}".format(prefix, next(self.ids))
+
+    def fails(self):
+        with self.lock:
+            return self.random.random() < self.error_rate
+
+    def first_token_latency(self):
+        if not self.latency:
+            return 0
+        with self.lock:
+            return self.random.lognormvariate(math.log(self.latency), self.latency_sigma)
+
+    def answer(self, model, request, prompt):
+        """The replayed answer to the scenario `prompt` wraps, or a canned one."""
+        number = self.scenarios.number(prompt)
+        for answers in (self.replay.get(model), self.replay.get(None)):
+            if answers and number in answers:
+                return answers[number]
+        return mock_answer(request)
+
+    def answers(self, model, request, prompt, count):
+        """`count` answers to one request (OpenAI n, Gemini candidateCount): answer(), then
+        count - 1 more that are canned afresh unless replayed."""
+        return [self.answer(model, request if index == 0 else dict(request, sample=index), prompt) for index in range(count)]
+
+    def admit(self, provider, model, tokens):
+        """(seconds to wait, quotas): 0 when `model` takes a request of `tokens` tokens now."""
+        with self.lock:
+            key = (provider, model)
+            if key not in self.quotas:
+                self.quotas[key] = {
+                    kind: Quota(limit, self.burst_seconds) if limit else None for kind, limit in self.limits.items()
+                }
+            quotas = self.quotas[key]
+            amounts = {"requests": 1, "tokens": tokens}
+            wait = max([quota.wait_time(amounts[kind]) for kind, quota in quotas.items() if quota] or [0])
+            if not wait:
+                for kind, quota in quotas.items():
+                    if quota:
+                        quota.take(amounts[kind])
+            return wait, quotas
+
+    def count(self, name, n=1):
+        with self.lock:
+            self.stats[name] += n
+
+    def enter(self):
+        with self.lock:
+            self.in_flight += 1
+            self.stats["peak_in_flight"] = max(self.stats["peak_in_flight"], self.in_flight)
+
+    def leave(self):
+        with self.lock:
+            self.in_flight -= 1
+
+    def generation(self, answer):
+        """The pieces of `answer`, each yielded once it is generated: after the
+        first-token latency, then at tokens_per_s."""
+        time.sleep(self.first_token_latency())
+        for piece in _pieces(answer):
+            if self.tokens_per_s:
+                time.sleep(len(piece) / 4 / self.tokens_per_s)
+            yield piece
+
+
+def sse(obj, event=None):
+    """One server-sent event."""
+    return "{}data: {}\n\n".format("event: {}\n".format(event) if event else "", json.dumps(obj)).encode("utf-8")
+
+
+def ndjson(obj):
+    return (json.dumps(obj) + "\n").encode("utf-8")
+
+
+class MockHandler(BaseHTTPRequestHandler):
+    # keep-alive, so that the runners' connection pools are exercised as against the real APIs
+    protocol_version = "HTTP/1.1"
+    state = None
+    routes = [
+        ("POST", r"/v1/chat/completions", "openai_chat"),
+        ("POST", r"/v1/files", "openai_upload_file"),
+        ("GET", r"/v1/files/(?P<file_id>[^/]+)/content", "openai_file_content"),
+        ("POST", r"/v1/batches", "openai_create_batch"),
+        ("GET", r"/v1/batches/(?P<batch_id>[^/]+)", "openai_retrieve_batch"),
+        ("POST", r"/v1/messages", "anthropic_messages"),
+        ("POST", r"/v1/messages/batches", "anthropic_create_batch"),
+        ("GET", r"/v1/messages/batches/(?P<batch_id>[^/]+)/results", "anthropic_batch_results"),
+        ("GET", r"/v1/messages/batches/(?P<batch_id>[^/]+)", "anthropic_retrieve_batch"),
+        ("POST", r"/v1beta/models/(?P<model>[^/:]+):(?P<method>generateContent|streamGenerateContent)", "gemini_generate"),
+        ("POST", r"/api/chat", "ollama_chat"),
+        ("GET", r"/mock/stats", "mock_stats"),
+    ]
+
+    def _dispatch(self, method):
+        # the body is read whatever the route, so the connection can serve the next request
+        self.body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        path = self.path.split("?", 1)[0]
+        for route_method, pattern, name in self.routes:
+            match = re.fullmatch(pattern, path)
+            if route_method == method and match:
+                return getattr(self, name)(**match.groupdict())
+        self.send_json({"error": {"type": "not_found_error", "message": "no route for {} {}".format(method, path)}}, 404)
+
+    def do_GET(self):
+        self._dispatch("GET")
+
+    def do_POST(self):
+        self._dispatch("POST")
+
+    def log_message(self, format, *args):
+        pass
+
+    def read_body(self):
+        return self.body
+
+    def send_body(self, body, status=200, content_type="application/json", headers=None):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, str(value))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def send_json(self, obj, status=200, headers=None):
+        self.send_body(json.dumps(obj).encode("utf-8"), status, headers=headers)
+
+    def base_url(self):
+        return "http://{}".format(self.headers.get("Host"))
+
+    def mock_stats(self):
+        with self.state.lock:
+            self.send_json(dict(self.state.stats, in_flight=self.state.in_flight))
+
+    ## Answers, whole or streamed ##########
+    def admit(self, provider, model, tokens):
+        """The rate-limit headers of the answer, or None once the 429 or failure the request gets instead is sent."""
+        self.state.count("requests")
+        wait, quotas = (0, {}) if provider == "ollama" else self.state.admit(provider, model, tokens)
+        if wait:
+            self.state.count("rate_limited")
+            body, headers = error_response(provider, 429, wait)
+            self.send_json(body, 429, headers)
+            return None
+        if self.state.fails():
+            self.state.count("errors")
+            status = {"openai": 500, "anthropic": 529, "google": 503}.get(provider, 500)
+            body, headers = error_response(provider, status)
+            self.send_json(body, status, headers)
+            return None
+        return rate_limit_headers(provider, quotas)
+
+    def generate(self, answer):
+        """Wait until the whole of `answer` is generated."""
+        self.state.enter()
+        try:
+            for _ in self.state.generation(answer):
+                pass
+        finally:
+            self.state.leave()
+        self.state.count("output_tokens", _tokens(answer))
+
+    def stream(self, answer, content_type, headers, start, event, end):
+        """Stream `answer` as it is generated, in chunked encoding: the frames of
+        `start`, event(piece, text so far) for every piece, then the frames of end(text)."""
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Transfer-Encoding", "chunked")
+        for name, value in headers.items():
+            self.send_header(name, str(value))
+        self.end_headers()
+
+        def send(frame):
+            self.wfile.write(b"%x\r\n%s\r\n" % (len(frame), frame))
+
+        self.state.enter()
+        text = ""
+        try:
+            for frame in start:
+                send(frame)
+            for piece in self.state.generation(answer):
+                text += piece
+                send(event(piece, text))
+            for frame in end(text):
+                send(frame)
+            self.wfile.write(b"0\r\n\r\n")
+        except (BrokenPipeError, ConnectionResetError):
+            # the client closed the stream (--stop_after): the generation stops too
+            self.state.count("streams_closed")
+            self.close_connection = True
+        finally:
+            self.state.leave()
+            self.state.count("output_tokens", _tokens(text) if text else 0)
+
+    def openai_chat(self):
+        request = json.loads(self.read_body())
+        model = request.get("model", "mock")
+        answers = self.state.answers(model, request, user_text(request.get("messages", [])), request.get("n") or 1)
+        answer = answers[0]
+        completion = openai_completion(request, answers if len(answers) > 1 else answer)
+        headers = self.admit("openai", model, completion["usage"]["total_tokens"])
+        if headers is None:
+            return
+        if not request.get("stream"):
+            # the choices are generated side by side
+            self.generate(max(answers, key=len))
+            return self.send_json(completion, headers=headers)
+
+        def chunk(delta, finish_reason=None):
+            return {
+                "id": completion["id"], "object": "chat.completion.chunk", "created": completion["created"], "model": model,
+                "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}],
+            }
+
+        def end(text):
+            frames = [sse(chunk({}, "stop"))]
+            if (request.get("stream_options") or {}).get("include_usage"):
+                usage = dict(completion["usage"], completion_tokens=_tokens(text))
+                usage["total_tokens"] = usage["prompt_tokens"] + usage["completion_tokens"]
+                frames.append(sse(dict(chunk({}), choices=[], usage=usage)))
+            return frames + [b"data: [DONE]\n\n"]
+
+        start = [sse(chunk({"role": "assistant", "content": ""}))]
+        self.stream(answer, "text/event-stream", headers, start, lambda piece, text: sse(chunk({"content": piece})), end)
+
+    def anthropic_messages(self):
+        request = json.loads(self.read_body())
+        model = request.get("model", "mock")
+        answer = self.state.answer(model, request, user_text(request.get("messages", [])))
+        message = anthropic_message(request, answer)
+        headers = self.admit("anthropic", model, message["usage"]["input_tokens"] + message["usage"]["output_tokens"])
+        if headers is None:
+            return
+        if not request.get("stream"):
+            self.generate(answer)
+            return self.send_json(message, headers=headers)
+
+        start = [
+            sse({"type": "message_start", "message": dict(
+                message, content=[], stop_reason=None, usage=dict(message["usage"], output_tokens=1)
+            )}, "message_start"),
+            sse({"type": "content_block_start", "index": 0, "content_block": {"type": "text", "text": ""}}, "content_block_start"),
+        ]
+
+        def event(piece, text):
+            return sse({"type": "content_block_delta", "index": 0, "delta": {"type": "text_delta", "text": piece}}, "content_block_delta")
+
+        def end(text):
+            return [
+                sse({"type": "content_block_stop", "index": 0}, "content_block_stop"),
+                sse({"type": "message_delta", "delta": {"stop_reason": "end_turn", "stop_sequence": None},
+                     "usage": {"output_tokens": _tokens(text)}}, "message_delta"),
+                sse({"type": "message_stop"}, "message_stop"),
+            ]
+
+        self.stream(answer, "text/event-stream", headers, start, event, end)
+
+    def gemini_generate(self, model, method):
+        request = json.loads(self.read_body())
+        prompt = gemini_text(request)
+        answers = self.state.answers(model, request, prompt, (request.get("generationConfig") or {}).get("candidateCount") or 1)
+        answer = answers[0]
+        output_tokens = sum(_tokens(text) for text in answers)
+        headers = self.admit("google", model, _tokens(prompt) + output_tokens)
+        if headers is None:
+            return
+        if method == "generateContent":
+            self.generate(max(answers, key=len))
+            return self.send_json(gemini_response(request, model, answers if len(answers) > 1 else answer, output_tokens), headers=headers)
+
+        def event(piece, text):
+            return sse(gemini_response(request, model, piece, _tokens(text), done=False))
+
+        self.stream(answer, "text/event-stream", headers, [], event, lambda text: [sse(gemini_response(request, model, "", _tokens(text)))])
+
+    def ollama_chat(self):
+        request = json.loads(self.read_body())
+        answer = self.state.answer(request.get("model", "mock"), request, user_text(request.get("messages", [])))
+        headers = self.admit("ollama", request.get("model", "mock"), 0)
+        if headers is None:
+            return
+        # like the real server, at most num_parallel requests are generated at once; the others queue
+        with self.state.ollama_slots:
+            started = time.monotonic()
+            if not request.get("stream", True):
+                self.generate(answer)
+                return self.send_json(ollama_response(request, answer, True, _tokens(answer), time.monotonic() - started))
+
+            def end(text):
+                return [ndjson(ollama_response(request, "", True, _tokens(text), time.monotonic() - started))]
+
+            self.stream(answer, "application/x-ndjson", headers, [], lambda piece, text: ndjson(ollama_response(request, piece)), end)
+
+    ## OpenAI Batch API ##########
+    def openai_upload_file(self):
+        # multipart/form-data with a "purpose" field and a "file" part
+        message = email.parser.BytesParser().parsebytes(
+            b"Content-Type: " + self.headers["Content-Type"].encode() + b"\r\n\r\n" + self.read_body()
+        )
+        fields = {part.get_param("name", header="content-disposition"): part for part in message.get_payload()}
+        content = fields["file"].get_payload(decode=True)
+        file_id = self.state.new_id("file-")
+        self.state.files[file_id] = content
+        self.send_json(self.openai_file(file_id, fields["file"].get_filename() or "upload.jsonl", fields["purpose"].get_payload()))
+
+    def openai_file(self, file_id, filename="batch.jsonl", purpose="batch"):
+        return {
+            "id": file_id, "object": "file", "bytes": len(self.state.files[file_id]), "created_at": int(time.time()),
+            "filename": filename, "purpose": purpose, "status": "processed",
+        }
+
+    def openai_file_content(self, file_id):
+        if file_id not in self.state.files:
+            return self.send_json({"error": {"message": "No such file: {}".format(file_id)}}, 404)
+        self.send_body(self.state.files[file_id], content_type="application/octet-stream")
+
+    def openai_create_batch(self):
+        body = json.loads(self.read_body())
+        lines = self.state.files[body["input_file_id"]].decode("utf-8").splitlines()
+        batch_id = self.state.new_id("batch_")
+        self.state.batches[batch_id] = {
+            "provider": "openai",
+            "created_at": time.time(),
+            "input_file_id": body["input_file_id"],
+            "endpoint": body["endpoint"],
+            "completion_window": body["completion_window"],
+            "requests": [json.loads(line) for line in lines if line.strip()],
+        }
+        self.send_json(self.openai_batch(batch_id))
+
+    def _finish_openai_batch(self, batch):
+        if "output_file_id" in batch:
+            return
+        output, errors = [], []
+        for entry in batch["requests"]:
+            if self.state.fails():
+                errors.append({"custom_id": entry["custom_id"], "response": {"status_code": 500, "body": {"error": {"message": "mock failure"}}}, "error": None})
+            else:
+                answers = self.state.answers(entry["body"].get("model"), entry["body"], user_text(entry["body"].get("messages", [])), entry["body"].get("n") or 1)
+                body = openai_completion(entry["body"], answers if len(answers) > 1 else answers[0])
+                output.append({"custom_id": entry["custom_id"], "response": {"status_code": 200, "body": body}, "error": None})
+        for key, lines in (("output_file_id", output), ("error_file_id", errors)):
+            file_id = None
+            if lines:
+                file_id = self.state.new_id("file-")
+                self.state.files[file_id] = "".join(json.dumps(line) + "\n" for line in lines).encode("utf-8")
+            batch[key] = file_id
+        batch["counts"] = {"total": len(batch["requests"]), "completed": len(output), "failed": len(errors)}
+
+    def openai_batch(self, batch_id):
+        batch = self.state.batches[batch_id]
+        ended = time.time() >= batch["created_at"] + self.state.batch_delay
+        if ended:
+            with self.state.lock:
+                self._finish_openai_batch(batch)
+        return {
+            "id": batch_id, "object": "batch", "endpoint": batch["endpoint"], "input_file_id": batch["input_file_id"],
+            "completion_window": batch["completion_window"], "created_at": int(batch["created_at"]),
+            "status": "completed" if ended else "in_progress",
+            "output_file_id": batch.get("output_file_id"), "error_file_id": batch.get("error_file_id"),
+            "request_counts": batch.get("counts", {"total": len(batch["requests"]), "completed": 0, "failed": 0}),
+        }
+
+    def openai_retrieve_batch(self, batch_id):
+        if batch_id not in self.state.batches:
+            return self.send_json({"error": {"message": "No such batch: {}".format(batch_id)}}, 404)
+        self.send_json(self.openai_batch(batch_id))
+
+    ## Anthropic Message Batches ##########
+    def anthropic_create_batch(self):
+        body = json.loads(self.read_body())
+        batch_id = self.state.new_id("msgbatch_")
+        self.state.batches[batch_id] = {"provider": "anthropic", "created_at": time.time(), "requests": body["requests"]}
+        self.send_json(self.anthropic_batch(batch_id))
+
+    def _finish_anthropic_batch(self, batch):
+        if "results" in batch:
+            return
+        results = []
+        for entry in batch["requests"]:
+            if self.state.fails():
+                result = {"type": "errored", "error": {"type": "error", "error": {"type": "api_error", "message": "mock failure"}}}
+            else:
+                answer = self.state.answer(entry["params"].get("model"), entry["params"], user_text(entry["params"].get("messages", [])))
+                result = {"type": "succeeded", "message": anthropic_message(entry["params"], answer)}
+            results.append({"custom_id": entry["custom_id"], "result": result})
+        batch["results"] = results
+
+    def anthropic_batch(self, batch_id):
+        batch = self.state.batches[batch_id]
+        ended = time.time() >= batch["created_at"] + self.state.batch_delay
+        counts = {"processing": len(batch["requests"]), "succeeded": 0, "errored": 0, "canceled": 0, "expired": 0}
+        if ended:
+            with self.state.lock:
+                self._finish_anthropic_batch(batch)
+            counts["processing"] = 0
+            for entry in batch["results"]:
+                counts[entry["result"]["type"]] += 1
+        return {
+            "id": batch_id, "type": "message_batch",
+            "processing_status": "ended" if ended else "in_progress",
+            "request_counts": counts,
+            "created_at": _iso(batch["created_at"]),
+            "expires_at": _iso(batch["created_at"] + 24 * 3600),
+            "ended_at": _iso(batch["created_at"] + self.state.batch_delay) if ended else None,
+            "archived_at": None, "cancel_initiated_at": None,
+            "results_url": "{}/v1/messages/batches/{}/results".format(self.base_url(), batch_id) if ended else None,
+        }
+
+    def anthropic_retrieve_batch(self, batch_id):
+        if batch_id not in self.state.batches:
+            return self.send_json({"type": "error", "error": {"type": "not_found_error", "message": batch_id}}, 404)
+        self.send_json(self.anthropic_batch(batch_id))
+
+    def anthropic_batch_results(self, batch_id):
+        batch = self.state.batches.get(batch_id)
+        if batch is None or "results" not in batch:
+            return self.send_json({"type": "error", "error": {"type": "not_found_error", "message": batch_id}}, 404)
+        body = "".join(json.dumps(entry) + "\n" for entry in batch["results"]).encode("utf-8")
+        self.send_body(body, content_type="application/binary")
+
+
+def make_server(host="127.0.0.1", port=8765, batch_delay=2, error_rate=0, seed=0, **options):
+    """A ThreadingHTTPServer of its own MockState; options are MockState's."""
+    handler = type("Handler", (MockHandler,), {"state": MockState(batch_delay, error_rate, seed, **options)})
+    return ThreadingHTTPServer((host, port), handler)
+
+
+if __name__ == '__main__':
+    args = parser.parse_args()
+    server = make_server(
+        args.host, args.port, args.batch_delay, args.error_rate, args.random_seed,
+        latency=args.latency, latency_sigma=args.latency_sigma, tokens_per_s=args.tokens_per_s,
+        rpm=args.rpm, tpm=args.tpm, burst_seconds=args.burst_seconds, num_parallel=args.num_parallel,
+        replay=load_replay(args.replay), scenarios=ScenarioIndex(args.dataset, args.system_dataset),
+    )
+    print("Mock provider API on http://{}:{}".format(args.host, args.port))
+    server.serve_forever()
@@ -0,0 +1,197 @@
+"""
+Client-side rate limiting for llm_runner.py.
+
+Every (provider, model) gets one RateLimiter, shared by all requests to it:
+
+    requests per minute   a token bucket charged 1 per request
+    tokens per minute     a token bucket charged the estimated tokens of a request,
+                          corrected with the usage reported in the answer
+    concurrency           AIMD: +1 request in flight after a full round of successes,
+                          halved on a rate-limit error (once per retry-after pause)
+
+The buckets start from --rpm/--tpm (unlimited when unset) and are resynchronised
+from the rate-limit headers of every answer (OpenAI x-ratelimit-*, Anthropic
+anthropic-ratelimit-*). A rate-limit error pauses the whole limiter for the
+provider's retry-after, so the in-flight requests back off together instead of
+each one hitting 429 again.
+"""
+
+import asyncio
+import re
+import time
+from datetime import datetime, timezone
+
+# Output tokens assumed for a request before any answer has been seen
+DEFAULT_OUTPUT_TOKENS = 500
+# Seconds of quota a bucket may save up. Providers enforce per-minute limits over
+# shorter windows too, so a full minute's quota sent at once still gets 429s.
+BURST_SECONDS = 0.1
+
+
+class TokenBucket:
+    """`capacity` units per minute, refilled continuously; None means unlimited.
+
+    At most BURST_SECONDS of quota are saved up, so requests are paced evenly.
+    """
+
+    def __init__(self, capacity=None):
+        self.capacity = capacity
+        self.tokens = self.burst
+        self._updated = time.monotonic()
+
+    @property
+    def burst(self):
+        return (self.capacity or 0) * BURST_SECONDS / 60
+
+    def _refill(self):
+        now = time.monotonic()
+        if self.capacity:
+            self.tokens = min(max(self.burst, 1), self.tokens + (now - self._updated) * self.capacity / 60)
+        self._updated = now
+
+    def wait_time(self, amount):
+        """Seconds until `amount` units are available (a request larger than the burst waits for a full bucket)."""
+        if not self.capacity:
+            return 0
+        self._refill()
+        missing = min(amount, max(self.burst, 1)) - self.tokens
+        return max(0, missing * 60 / self.capacity)
+
+    def charge(self, amount):
+        self._refill()
+        self.tokens -= amount
+
+    def sync(self, limit=None, remaining=None):
+        """Adopt the quota reported by the provider."""
+        self._refill()
+        if limit:
+            if not self.capacity:
+                self.tokens = limit * BURST_SECONDS / 60
+            self.capacity = limit
+        if remaining is not None and self.capacity:
+            self.tokens = min(self.tokens, remaining)
+
+
+class RateLimiter:
+    """Request and token buckets plus AIMD concurrency for one provider and model."""
+
+    def __init__(self, rpm=None, tpm=None, max_concurrency=8):
+        self.requests = TokenBucket(rpm)
+        self.tokens = TokenBucket(tpm)
+        self.max_concurrency = max_concurrency
+        self.concurrency = max_concurrency
+        self.output_tokens = DEFAULT_OUTPUT_TOKENS
+        self._successes = 0
+        self._paused_until = 0
+
+    def estimate_tokens(self, text):
+        """Tokens a request will use: ~4 characters per input token plus the average answer."""
+        return len(text) // 4 + self.output_tokens
+
+    async def acquire(self, estimated_tokens):
+        while True:
+            wait = max(
+                self._paused_until - time.monotonic(),
+                self.requests.wait_time(1),
+                self.tokens.wait_time(estimated_tokens),
+            )
+            if wait <= 0:
+                break
+            await asyncio.sleep(wait)
+        self.requests.charge(1)
+        self.tokens.charge(estimated_tokens)
+
+    def on_success(self, estimated_tokens, input_tokens=None, output_tokens=None, headers=None):
+        if input_tokens is not None and output_tokens is not None:
+            self.tokens.charge(input_tokens + output_tokens - estimated_tokens)
+            self.output_tokens = 0.9 * self.output_tokens + 0.1 * output_tokens
+        if headers:
+            limits = parse_rate_limit_headers(headers)
+            self.requests.sync(limits.get("requests_limit"), limits.get("requests_remaining"))
+            self.tokens.sync(limits.get("tokens_limit"), limits.get("tokens_remaining"))
+
+        # additive increase: one more request in flight per `concurrency` successes
+        self._successes += 1
+        if self._successes >= self.concurrency and self.concurrency < self.max_concurrency:
+            self.concurrency += 1
+            self._successes = 0
+
+    def on_rate_limited(self, retry_after=None):
+        # multiplicative decrease, and everyone waits out the retry-after; the 429s of
+        # requests already in flight during that pause are the same overload, so the
+        # decrease happens at most once per pause
+        now = time.monotonic()
+        if now >= self._paused_until:
+            self.concurrency = max(1, self.concurrency // 2)
+            self._successes = 0
+        if retry_after:
+            self._paused_until = max(self._paused_until, now + retry_after)
+
+
+_limiters = {}
+
+
+def rate_limiter(provider, model, rpm=None, tpm=None, max_concurrency=8):
+    """The RateLimiter shared by every request to `model` of `provider`."""
+    key = (provider, model)
+    if key not in _limiters:
+        _limiters[key] = RateLimiter(rpm, tpm, max_concurrency)
+    return _limiters[key]
+
+
+## Headers ##########
+def parse_duration(value):
+    """Seconds in an OpenAI reset value ("20ms", "1s", "6m0s") or a retry-after value."""
+    if value is None:
+        return None
+    value = str(value).strip()
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    units = {"ms": 0.001, "s": 1, "m": 60, "h": 3600}
+    parts = re.findall(r"([\d.]+)(ms|s|m|h)", value)
+    if parts:
+        return sum(float(number) * units[unit] for number, unit in parts)
+    # Anthropic resets and HTTP-date retry-afters are timestamps
+    for parse in (datetime.fromisoformat, _parse_http_date):
+        try:
+            moment = parse(value.replace("Z", "+00:00"))
+        except (ValueError, TypeError):
+            continue
+        return max(0, (moment - datetime.now(timezone.utc)).total_seconds())
+    return None
+
+
+def _parse_http_date(value):
+    from email.utils import parsedate_to_datetime
+    return parsedate_to_datetime(value)
+
+
+def _int(value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def parse_rate_limit_headers(headers):
+    """requests_/tokens_ limit, remaining and reset (seconds) from OpenAI or Anthropic headers."""
+    headers = {key.lower(): value for key, value in dict(headers).items()}
+    limits = {}
+    for kind in ("requests", "tokens"):
+        for prefix, template in (("x-ratelimit-", "{field}-{kind}"), ("anthropic-ratelimit-", "{kind}-{field}")):
+            names = {field: prefix + template.format(field=field, kind=kind) for field in ("limit", "remaining", "reset")}
+            if names["limit"] in headers or names["remaining"] in headers:
+                limits[kind + "_limit"] = _int(headers.get(names["limit"]))
+                limits[kind + "_remaining"] = _int(headers.get(names["remaining"]))
+                limits[kind + "_reset"] = parse_duration(headers.get(names["reset"]))
+    return limits
+
+
+def retry_after_seconds(headers):
+    """Seconds to wait from retry-after-ms or retry-after, None when absent."""
+    headers = {key.lower(): value for key, value in dict(headers).items()}
+    if "retry-after-ms" in headers:
+        return parse_duration(headers["retry-after-ms"]) / 1000
+    return parse_duration(headers.get("retry-after"))
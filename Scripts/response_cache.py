@@ -0,0 +1,138 @@
+"""
+Persistent response cache for llm_runner.py.
+
+Answers are stored in one SQLite file, keyed by a SHA-256 of the provider and the
+full request: model, messages and every sampling parameter the adapter sends,
+with the prompts as the dataset holds them (see llm_runner.cache_key()). A
+rerun with unchanged prompts and parameters, a resumed crash and a duplicate
+scenario are answered from the file instead of the API. Concurrent requests for
+the same key are sent once.
+
+The file is capped at --cache_size_mb of answer text; past that, the least
+recently used answers are evicted. --replay opens it read-only: every answer
+must already be cached, and nothing is sent to the provider.
+
+A request answered with several samples at once (--samples with OpenAI's n or
+Gemini's candidate_count) keeps all of them, as a JSON list in the samples column.
+"""
+
+import asyncio
+import hashlib
+import json
+import os
+import sqlite3
+import time
+
+
+class CacheMiss(KeyError):
+    """An answer that --replay needed is not in the cache."""
+
+
+def request_key(provider, request):
+    """Content address of one API request."""
+    payload = json.dumps([provider, request], sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class ResponseCache:
+
+    def __init__(self, path, max_bytes=1 << 30, read_only=False):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.read_only = read_only
+        self.hits = 0
+        self.misses = 0
+        self._pending = {}
+
+        if read_only:
+            if not os.path.exists(path):
+                raise FileNotFoundError("No response cache to replay: {}".format(path))
+            self._db = sqlite3.connect("file:{}?mode=ro".format(path), uri=True)
+        else:
+            self._db = sqlite3.connect(path)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute("PRAGMA synchronous=NORMAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS responses ("
+                " key TEXT PRIMARY KEY, provider TEXT, model TEXT, text TEXT,"
+                " input_tokens INTEGER, output_tokens INTEGER, size INTEGER, last_used REAL, samples TEXT)"
+            )
+            self._db.execute("CREATE INDEX IF NOT EXISTS responses_last_used ON responses (last_used)")
+        columns = {row[1] for row in self._db.execute("PRAGMA table_info(responses)")}
+        if "samples" not in columns and not read_only:
+            # a cache from before --samples
+            self._db.execute("ALTER TABLE responses ADD COLUMN samples TEXT")
+            columns.add("samples")
+        self._samples_column = "samples" if "samples" in columns else "NULL"
+        self.size = self._db.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+        if not read_only:
+            # a smaller --cache_size_mb than last time takes effect at once
+            self._evict()
+            self._db.commit()
+
+    def get(self, key):
+        """(text, input_tokens, output_tokens, samples) cached under key, or None; samples is None for a single answer."""
+        row = self._db.execute(
+            "SELECT text, input_tokens, output_tokens, {} FROM responses WHERE key = ?".format(self._samples_column), (key,)
+        ).fetchone()
+        if row is None:
+            return None
+        if not self.read_only:
+            self._db.execute("UPDATE responses SET last_used = ? WHERE key = ?", (time.time(), key))
+            self._db.commit()
+        return row[:3] + (json.loads(row[3]) if row[3] else None,)
+
+    def put(self, key, provider, model, text, input_tokens=None, output_tokens=None, samples=None):
+        samples = json.dumps(samples, ensure_ascii=False) if samples else None
+        size = len(text.encode("utf-8")) + (len(samples.encode("utf-8")) if samples else 0)
+        old = self._db.execute("SELECT size FROM responses WHERE key = ?", (key,)).fetchone()
+        self._db.execute(
+            "INSERT OR REPLACE INTO responses (key, provider, model, text, input_tokens, output_tokens, size, last_used, samples)"
+            " VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (key, provider, model, text, input_tokens, output_tokens, size, time.time(), samples),
+        )
+        self.size += size - (old[0] if old else 0)
+        self._evict()
+        self._db.commit()
+
+    def _evict(self):
+        while self.size > self.max_bytes:
+            rows = self._db.execute("SELECT key, size FROM responses ORDER BY last_used LIMIT 100").fetchall()
+            if not rows:
+                break
+            for key, size in rows:
+                if self.size <= self.max_bytes:
+                    break
+                self._db.execute("DELETE FROM responses WHERE key = ?", (key,))
+                self.size -= size
+
+    async def fetch(self, key, send):
+        """Cached (text, input_tokens, output_tokens, samples) of key, else the result of `await send()`.
+
+        `send` is expected to put() its answer. While one request for a key is in
+        flight, other requests for the same key wait for it and read its answer.
+        """
+        while True:
+            row = self.get(key)
+            if row is not None:
+                self.hits += 1
+                return row
+            if self.read_only:
+                raise CacheMiss("request {} is not in {}".format(key, self.path))
+            pending = self._pending.get(key)
+            if pending is None:
+                break
+            # resolves once the other request is stored, or has failed and we send our own
+            await pending
+
+        self.misses += 1
+        done = asyncio.get_running_loop().create_future()
+        self._pending[key] = done
+        try:
+            return await send()
+        finally:
+            del self._pending[key]
+            done.set_result(None)
+
+    def close(self):
+        self._db.close()
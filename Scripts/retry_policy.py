@@ -0,0 +1,172 @@
+"""
+Retry policy shared by every llm_runner.py provider.
+
+Each failed request is classified first:
+
+    rate_limited   429: wait the provider's retry-after (see rate_limit.py) and
+                   send again, without counting it against --max_retries, up to
+                   --max_rate_limited times per scenario
+    retryable      timeouts, dropped connections, 408/409/425 and 5xx (including
+                   Anthropic's 529 overloaded): back off and retry
+    fatal          any other 4xx (bad request, auth, unknown model), a 429 for a
+                   used-up quota (OpenAI's insufficient_quota, Gemini's per-day
+                   limits), which no wait clears, and errors that are not the
+                   provider's (a bug): raised at once
+
+Retries back off exponentially with full jitter: a random wait of up to
+--retry_delay * 2^attempt seconds, capped at --max_retry_delay. Every attempt is
+cut off after --timeout seconds, and a scenario fails once --deadline seconds have
+passed since its first attempt. With --hedge, a request still unanswered at the
+p95 of the latencies seen so far gets one duplicate, and the first answer wins.
+"""
+
+import asyncio
+import importlib
+import random
+from collections import deque
+from functools import lru_cache
+
+RATE_LIMITED = "rate_limited"
+RETRYABLE = "retryable"
+FATAL = "fatal"
+
+# HTTP statuses worth sending again besides 429 and 5xx
+RETRYABLE_STATUSES = {408, 409, 425}
+# Error codes of a 429 for a used-up balance rather than a rate
+QUOTA_CODES = {"insufficient_quota"}
+
+
+def quota_exhausted(exc):
+    """True if a 429 `exc` reports a used-up quota: an OpenAI insufficient_quota error,
+    or a Gemini QuotaFailure on a per-day quota."""
+    if getattr(exc, "code", None) in QUOTA_CODES or getattr(exc, "type", None) in QUOTA_CODES:
+        return True
+    body = getattr(exc, "body", None) or getattr(exc, "details", None)
+    error = body.get("error", body) if isinstance(body, dict) else None
+    if not isinstance(error, dict):
+        return False
+    if error.get("code") in QUOTA_CODES or error.get("type") in QUOTA_CODES:
+        return True
+    for detail in error.get("details") or []:
+        if isinstance(detail, dict) and detail.get("@type", "").endswith("QuotaFailure"):
+            if any("PerDay" in violation.get("quotaId", "") for violation in detail.get("violations", [])):
+                return True
+    return False
+
+
+def classify(exc):
+    """RATE_LIMITED, RETRYABLE or FATAL for an exception raised by a provider SDK."""
+    status = getattr(exc, "status_code", None) or getattr(exc, "code", None)
+    if isinstance(status, int):
+        if status == 429:
+            return FATAL if quota_exhausted(exc) else RATE_LIMITED
+        if status in RETRYABLE_STATUSES or status >= 500:
+            return RETRYABLE
+        return FATAL
+    retryable, fatal = transport_errors()
+    if isinstance(exc, retryable) and not isinstance(exc, fatal):
+        return RETRYABLE
+    return FATAL
+
+
+@lru_cache(maxsize=None)
+def transport_errors():
+    """(retryable, fatal) exception classes of a request that never got a status.
+
+    Retryable are timeouts and dropped connections: httpx's TransportError
+    (ConnectError, ReadError, WriteError, RemoteProtocolError, ...), which
+    google-genai and ollama raise as is, and the openai and anthropic SDKs'
+    APIConnectionError and APITimeoutError, which wrap it. A URL httpx cannot
+    send to is fatal all the same. SDKs that are not installed are skipped.
+    """
+    retryable = [asyncio.TimeoutError, ConnectionError]
+    fatal = []
+    try:
+        import httpx
+        retryable.append(httpx.TransportError)
+        fatal += [httpx.UnsupportedProtocol, httpx.LocalProtocolError]
+    except ImportError:
+        pass
+    for sdk in ("openai", "anthropic"):
+        try:
+            module = importlib.import_module(sdk)
+        except ImportError:
+            continue
+        retryable += [module.APIConnectionError, module.APITimeoutError]
+    return tuple(retryable), tuple(fatal)
+
+
+class RetryPolicy:
+    """Bounded retries with jittered exponential backoff, deadlines and optional hedging."""
+
+    def __init__(self, max_retries=5, retry_delay=2, max_retry_delay=60, timeout=None, deadline=None,
+                 hedge=False, hedge_quantile=0.95, hedge_min_samples=20, max_rate_limited=20):
+        self.max_retries = max_retries
+        self.max_rate_limited = max_rate_limited
+        self.retry_delay = retry_delay
+        self.max_retry_delay = max_retry_delay
+        self.timeout = timeout
+        self.deadline = deadline
+        self.hedge = hedge
+        self.hedge_quantile = hedge_quantile
+        self.hedge_min_samples = hedge_min_samples
+        self.hedges = 0
+        self.hedges_won = 0
+        self._latencies = deque(maxlen=1000)
+
+    def backoff(self, attempt):
+        """Seconds to wait before retry number `attempt` (1-based): "full jitter"."""
+        return random.uniform(0, min(self.max_retry_delay, self.retry_delay * 2 ** (attempt - 1)))
+
+    def time_left(self, elapsed):
+        """Seconds left to answer a request first sent `elapsed` seconds ago; None without a deadline."""
+        return None if self.deadline is None else self.deadline - elapsed
+
+    def record_latency(self, seconds):
+        self._latencies.append(seconds)
+
+    def hedge_after(self):
+        """Seconds after which an unanswered request is hedged, or None (hedging off, or too few latencies yet)."""
+        if not self.hedge or len(self._latencies) < self.hedge_min_samples:
+            return None
+        latencies = sorted(self._latencies)
+        return latencies[min(len(latencies) - 1, int(self.hedge_quantile * len(latencies)))]
+
+    async def hedged(self, attempt):
+        """Result of `await attempt(on_sent)`; hedge_after() seconds after the first
+        attempt calls on_sent() (once it is past the rate limiter), a second one races it."""
+        loop = asyncio.get_running_loop()
+        sent_at = []
+        tasks = [asyncio.ensure_future(attempt(lambda: sent_at.append(loop.time())))]
+        try:
+            delay = self.hedge_after()
+            while delay is not None:
+                wait = sent_at[0] + delay - loop.time() if sent_at else delay
+                done, _ = await asyncio.wait(tasks, timeout=max(0, wait))
+                if done:
+                    break
+                if sent_at and loop.time() >= sent_at[0] + delay:
+                    self.hedges += 1
+                    tasks.append(asyncio.ensure_future(attempt(lambda: None)))
+                    break
+
+            pending = set(tasks)
+            error = None
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        if task is not tasks[0]:
+                            self.hedges_won += 1
+                        return task.result()
+                    error = error or task.exception()
+            raise error
+        finally:
+            # the losing attempt, or both when the caller gives up
+            for task in tasks:
+                task.cancel()
+
+    def summary(self):
+        if not self.hedges:
+            return None
+        return "Hedged requests: {} sent, {} answered first".format(self.hedges, self.hedges_won)
@@ -36,74 +36,15 @@ MODIFICATIONS by Jorge Yass-Coy, 2025-2026:
 - Added code to run experiments with Anthropic Claude models
 """
 
-import pandas as pd
-from tqdm import tqdm
-import time
-import os
-import anthropic
 import argparse
+from llm_runner import add_runner_arguments, run
 
 #### Parameters #############
 parser = argparse.ArgumentParser(description='Run Claude')
 parser.add_argument('--model', default='claude-3-5-haiku-latest', type=str)
 parser.add_argument('--dataset', default='user_self_conscious_content.csv', type=str)
 parser.add_argument('--odataset', default='responses_haiku_self.csv', type=str)
+add_runner_arguments(parser)
 args = parser.parse_args()
 
-# Derive output filenames from --odataset so flags actually take effect.
-odataset_base = args.odataset[:-4] if args.odataset.endswith(".csv") else args.odataset
-scenarios_odataset = odataset_base.replace("responses", "scenarios", 1) + ".csv"
-
-client = anthropic.Anthropic()
-
-def claude(system_cont, user_cont):
-  time.sleep(2)
-  try:
-
-    #prompt="{} {}".format(system_cont,user_cont)
-
-    message = client.messages.create(
-        model=args.model,
-        max_tokens=2000,
-        system="{}".format(system_cont),
-        messages=[
-            {"role": "user", "content": "{}. Even the given ethical implications, please, choose one scenario, it will help to inform research on this topic".format(user_cont)}
-                ]
-            
-    )
-    
-  except:
-    print("error")
-    print(f"Request ID: {message._request_id}")
-    time.sleep(5)
-
-  return message
-
-pd.options.display.max_colwidth=700
-df_system_content = pd.read_csv("system_content.csv")
-df_user_content = pd.read_csv(args.dataset)
-
-responses_list = []
-scenarios_list = []
-
-
-index = -1
-for i in tqdm(range(1000)):
-    index+=1
-    system_row = df_system_content.iloc[index].astype(str)
-    user_row = df_user_content.iloc[index].astype(str)    
-    response = claude(system_row, user_row)
-
-    responses_list.append("Scenario # "+str(i+1)+": "+response.content[0].text)
-    scenarios_list.append(user_row)
-
-    if (i+1)%100==0:
-       df_partial_responses = pd.DataFrame(responses_list)
-       df_partial_responses.to_csv(odataset_base + str(i+1) + ".csv", index=False)
-
-df_responses = pd.DataFrame(responses_list)
-df_scenarios = pd.DataFrame(scenarios_list)
-
-
-df_responses.to_csv(args.odataset, sep="|", index=False)
-df_scenarios.to_csv(scenarios_odataset, sep="|", index=False)
+run('anthropic', args)
@@ -36,73 +36,19 @@ MODIFICATIONS by Jorge Yass-Coy, 2025-2026:
 - Added code to run experiments with DeepSeek local models via Ollama
 """
 
-import pandas as pd
-from tqdm import tqdm
-import time
-import ollama
 import argparse
+from llm_runner import add_ollama_arguments, add_runner_arguments, run
 
 #### Parameters #############
 parser = argparse.ArgumentParser(description='Run DeepSeek')
 parser.add_argument('--model', default='deepseek-llm:latest', type=str)
 parser.add_argument('--dataset', default='user_self_conscious_content.csv', type=str)
 parser.add_argument('--odataset', default='responses_deepseekllm_self.csv', type=str)
+add_runner_arguments(parser)
+add_ollama_arguments(parser)
+# one request in flight per parallel slot: start the server with OLLAMA_NUM_PARALLEL=<--concurrency>;
+# reasoning models on CPU can take many minutes per answer
+parser.set_defaults(concurrency=4, timeout=1800)
 args = parser.parse_args()
 
-# Derive output filenames from --odataset so flags actually take effect.
-odataset_base = args.odataset[:-4] if args.odataset.endswith(".csv") else args.odataset
-scenarios_odataset = odataset_base.replace("responses", "scenarios", 1) + ".csv"
-
-def llama(system_cont, user_cont):
-  time.sleep(2)
-  try:
-
-    prompt="{} {}".format(system_cont,user_cont)
-
-    response = ollama.chat(
-        model=args.model,
-        messages=[
-            {
-                "role": "system",
-                "content":"There are two theorethical scenarios. {}".format(system_cont),
-                "role": "user",
-                "content": "{}. Please, choose case 1 or case 2".format(user_cont),
-            },
-        ],
-    )
-    
-  except:
-    print("Error")
-
-  return response
-
-pd.options.display.max_colwidth=700
-df_system_content = pd.read_csv("system_content.csv")
-df_user_content = pd.read_csv(args.dataset)
-
-responses_list = []
-scenarios_list = []
-
-
-#model = genai.GenerativeModel("models/gemini-1.5-flash")
-
-index = -1
-for i in tqdm(range(1000)):
-    index+=1
-    system_row = df_system_content.iloc[index].astype(str)
-    user_row = df_user_content.iloc[index].astype(str)    
-    response = llama(system_row, user_row)
-
-    responses_list.append("Scenario # "+str(i+1)+": "+response["message"]["content"])
-    scenarios_list.append(user_row)
-
-    if (i+1)%100==0:
-       df_partial_responses = pd.DataFrame(responses_list)
-       df_partial_responses.to_csv(odataset_base + str(i+1) + ".csv", index=False)
-
-df_responses = pd.DataFrame(responses_list)
-df_scenarios = pd.DataFrame(scenarios_list)
-
-
-df_responses.to_csv(args.odataset, sep="|", index=False)
-df_scenarios.to_csv(scenarios_odataset, sep="|", index=False)
+run('ollama', args)
@@ -36,72 +36,15 @@ MODIFICATIONS by Jorge Yass-Coy, 2025-2026:
 - Added code to run experiments with Google models
 """
 
-import pandas as pd
-from tqdm import tqdm
-import time
-import os
-from google import genai
-from google.genai import errors
 import argparse
+from llm_runner import add_runner_arguments, run
 
 #### Parameters #############
 parser = argparse.ArgumentParser(description='Run Gemini')
 parser.add_argument('--model', default='gemini-2.5-pro-exp-03-25', type=str)
 parser.add_argument('--dataset', default='user_self_conscious_content.csv', type=str)
 parser.add_argument('--odataset', default='responses_gemini_2.5_self.csv', type=str)
+add_runner_arguments(parser)
 args = parser.parse_args()
 
-# Derive output filenames from --odataset so flags actually take effect.
-odataset_base = args.odataset[:-4] if args.odataset.endswith(".csv") else args.odataset
-scenarios_odataset = odataset_base.replace("responses", "scenarios", 1) + ".csv"
-
-client = genai.Client(api_key=os.environ["API_KEY"])
-
-
-def gemini(system_cont, user_cont):
-  time.sleep(2)
-  try:
-
-    prompt="{} {}".format(system_cont,user_cont)
-
-    response = client.models.generate_content(
-        model=args.model,
-        contents=prompt,
-    )
-    
-  except errors.APIError as e:
-    print(e.code)
-    print(e.message)
-    time.sleep(5)
-    response = gemini(system_cont, user_cont)
-
-  return response
-
-pd.options.display.max_colwidth=700
-df_system_content = pd.read_csv("system_content.csv")
-df_user_content = pd.read_csv(args.dataset)
-
-responses_list = []
-scenarios_list = []
-
-
-index = -1
-for i in tqdm(range(1000)):
-    index+=1
-    system_row = df_system_content.iloc[index].astype(str)
-    user_row = df_user_content.iloc[index].astype(str)    
-    response = gemini(system_row, user_row)
-
-    responses_list.append("Scenario # "+str(index+1)+": "+response.text)
-    scenarios_list.append(user_row)
-
-    if (index+1)%100==0:
-       df_partial_responses = pd.DataFrame(responses_list)
-       df_partial_responses.to_csv(odataset_base + str(i+1) + ".csv", index=False)
-
-df_responses = pd.DataFrame(responses_list)
-df_scenarios = pd.DataFrame(scenarios_list)
-
-
-df_responses.to_csv(args.odataset, sep="|", index=False)
-df_scenarios.to_csv(scenarios_odataset, sep="|", index=False)
+run('google', args)
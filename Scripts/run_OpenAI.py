@@ -36,14 +36,8 @@ MODIFICATIONS by Jorge Yass-Coy, 2025-2026:
 - Added code to run experiments with OpenAI models
 """
 
-import openai
-import pandas as pd
-from tqdm import tqdm
-import time
-from openai import OpenAI
-client = OpenAI()
-
 import argparse
+from llm_runner import add_runner_arguments, run
 
 #### Parameters #############
 parser = argparse.ArgumentParser(description='Run GPT')
@@ -51,57 +45,7 @@ parser.add_argument('--model', default='o3-mini', type=str)
 #parser.add_argument('--model', default='gpt-4.1', type=str)
 parser.add_argument('--dataset', default='user_self_conscious_content.csv', type=str)
 parser.add_argument('--odataset', default='responses_openai_o3_self2.csv', type=str)
+add_runner_arguments(parser)
 args = parser.parse_args()
 
-# Derive output filenames from --odataset so flags actually take effect.
-odataset_base = args.odataset[:-4] if args.odataset.endswith(".csv") else args.odataset
-scenarios_odataset = odataset_base.replace("responses", "scenarios", 1) + ".csv"
-
-def chatgpt(system_cont, user_cont):
-  try:
-
-    completation = client.chat.completions.create(
-        #model="o1-2024-12-17",
-        #model="gpt-4.1-2025-04-14",
-        model=args.model,
-        messages=[
-            {"role": "system", "content": "Please respond to the scenarios."},
-            {"role": "system", "content": "{}".format(system_cont)},
-            {"role": "user", "content": "{}".format(user_cont)},
-        ]
-    )
-  except openai.error.OpenAIError as e:
-    time.sleep(2)
-    completation = chatgpt(system_cont, user_cont)
-
-  return completation
-
-
-pd.options.display.max_colwidth=1000
-df_system_content = pd.read_csv("system_content.csv")
-df_user_content = pd.read_csv(args.dataset)
-
-responses_list = []
-scenarios_list = []
-
-
-index = -1
-for i in tqdm(range(1000)):
-    index+=1
-    system_row = df_system_content.iloc[index].astype(str)
-    user_row = df_user_content.iloc[index].astype(str)    
-    response = chatgpt(system_row, user_row)
-
-    responses_list.append("Scenario # "+str(i+1)+": "+response.choices[0].message.content)
-    scenarios_list.append(user_row)
-
-    if (i+1)%100==0:
-       df_partial_responses = pd.DataFrame(responses_list)
-       df_partial_responses.to_csv(odataset_base + str(i+1) + ".csv", index=False)
-
-df_responses = pd.DataFrame(responses_list)
-df_scenarios = pd.DataFrame(scenarios_list)
-
-
-df_responses.to_csv(args.odataset, sep="|", index=False)
-df_scenarios.to_csv(scenarios_odataset, sep="|", index=False)
+run('openai', args)
@@ -0,0 +1,112 @@
+"""
+Query several models in one invocation.
+
+Every scenario of --dataset goes to every target at once. A target is written
+`provider:model` or `label=provider:model`, or named by a column label of
+Data/responses.csv. Each target runs like its run_*.py script, with its own
+rate limiter, journal, progress bar (with ETA) and output
+<odir>/responses_<label>.csv, so a slow provider only delays its own targets.
+With --metrics run.prom, each target writes its metrics to run_<label>.prom.
+Targets of the same provider also share a worker pool of --pool requests in
+flight. By default, only the Ollama targets share one: the local server's
+parallel slots.
+
+    python run_targets.py                                   # the eight models of responses.csv
+    python run_targets.py --targets openai:gpt-4.1 ollama:deepseek-r1:8b --pool ollama=2
+"""
+
+import argparse
+import asyncio
+import copy
+import os
+import re
+import sys
+
+from llm_runner import PROVIDERS, add_ollama_arguments, add_runner_arguments, provider_pool, run_target
+
+# The models of Data/responses.csv: column label -> (provider, model)
+PAPER_TARGETS = {
+    "Anthropic_Claude3.7_Sonnet": ("anthropic", "claude-3-7-sonnet-latest"),
+    "Anthropic_Claude3.5_Haiku": ("anthropic", "claude-3-5-haiku-latest"),
+    "DeepSeek_R18b": ("ollama", "deepseek-r1:8b"),
+    "DeepSeek_LLM:latest": ("ollama", "deepseek-llm:latest"),
+    "Google_Gemini2.0": ("google", "gemini-2.0-flash"),
+    "OpenAI_GPT4.1": ("openai", "gpt-4.1"),
+    "OpenAI_O3-mini": ("openai", "o3-mini"),
+    "Google_Gemini2.5": ("google", "gemini-2.5-pro-exp-03-25"),
+}
+# Requests in flight per provider, across all of its targets (None: each target's --concurrency only)
+DEFAULT_POOLS = {"ollama": 4}
+
+#### Parameters #############
+parser = argparse.ArgumentParser(description='Query several models at once')
+parser.add_argument('--targets', default=list(PAPER_TARGETS), nargs='+', help='provider:model, label=provider:model or a responses.csv column label')
+parser.add_argument('--dataset', default='user_self_conscious_content.csv', type=str)
+parser.add_argument('--odir', default='.', type=str, help='directory of the responses_<label>.csv outputs')
+parser.add_argument('--pool', default=[], nargs='*', help='provider=N: requests in flight to the provider across its targets')
+add_runner_arguments(parser)
+add_ollama_arguments(parser)
+
+
+def parse_target(spec):
+    """(label, provider, model) of one --targets entry."""
+    if spec in PAPER_TARGETS:
+        return (spec,) + PAPER_TARGETS[spec]
+    label, _, target = spec.rpartition("=")
+    provider, _, model = target.partition(":")
+    if provider not in PROVIDERS or not model:
+        raise ValueError("{!r} is not provider:model with a provider among {}".format(spec, sorted(PROVIDERS)))
+    return label or "{}_{}".format(provider, model), provider, model
+
+
+def parse_pools(specs):
+    pools = dict(DEFAULT_POOLS)
+    for spec in specs:
+        provider, _, size = spec.partition("=")
+        pools[provider] = int(size)
+    return pools
+
+
+def file_label(label):
+    # labels such as "DeepSeek_LLM:latest" are not valid file names everywhere
+    return re.sub(r"[^\w.-]", "_", label)
+
+
+def target_odataset(odir, label):
+    return os.path.join(odir, "responses_{}.csv".format(file_label(label)))
+
+
+def target_metrics(metrics, label):
+    """The --metrics file of one target: the label goes before the extension (run.prom -> run_<label>.prom)."""
+    root, extension = os.path.splitext(metrics)
+    return "{}_{}{}".format(root, file_label(label), extension)
+
+
+async def run_targets(targets, args, pools):
+    """Run every (label, provider, model) target concurrently; returns {label: exception} of those that failed."""
+    runs = []
+    for position, (label, provider, model) in enumerate(targets):
+        target_args = copy.copy(args)
+        target_args.model = model
+        target_args.odataset = target_odataset(args.odir, label)
+        if args.metrics:
+            target_args.metrics = target_metrics(args.metrics, label)
+        pool = provider_pool(provider, pools[provider]) if pools.get(provider) else None
+        runs.append(run_target(provider, target_args, label, position, pool))
+    results = await asyncio.gather(*runs, return_exceptions=True)
+    return {label: result for (label, _, _), result in zip(targets, results) if isinstance(result, BaseException)}
+
+
+if __name__ == '__main__':
+    args = parser.parse_args()
+    targets = [parse_target(spec) for spec in args.targets]
+    labels = [label for label, _, _ in targets]
+    if len(set(labels)) < len(labels):
+        parser.error("duplicate target labels: {}".format(labels))
+    os.makedirs(args.odir, exist_ok=True)
+
+    failed = asyncio.run(run_targets(targets, args, parse_pools(args.pool)))
+    for label, _, _ in targets:
+        print("{}: {}".format(label, "failed: {!r}".format(failed[label]) if label in failed else target_odataset(args.odir, label)))
+    if failed:
+        sys.exit(1)
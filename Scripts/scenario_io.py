@@ -0,0 +1,426 @@
+"""
+Chunked writers for the scenarios produced by mm_generation.py.
+
+Scenarios are buffered and flushed to disk every `chunk_size` rows, so memory
+stays flat however many scenarios are generated, and an interrupted run keeps
+every chunk written so far.
+
+Formats:
+    csv     the four positionally-aligned, pipe-separated files of Stage 1
+            (system_content.csv, user_content.csv, user_self_conscious_content.csv,
+            scenario_info.csv), byte-identical to writing them in one go
+    jsonl   scenarios.jsonl, one JSON object per scenario
+    parquet scenarios/part-NNNNN.parquet, one file per chunk (needs pyarrow); a
+            part file is only readable once complete, so chunks go to separate files
+    arrow   scenarios.arrow, the typed scenario store (needs pyarrow): an Arrow IPC
+            stream with one record batch per chunk, keyed by scenario_id
+
+The scenario store holds, per scenario_id (1-based, the runners' "Scenario # N"):
+    scenario_hash                                generator.scenario_hash(), equal for
+                                                 structurally identical scenarios
+    scenario_dimension, signal_1, signal_2       dictionary-encoded enums
+    is_in_car, is_interventionism, is_law        booleans
+    scenario_dimension_group_type                list of group labels
+    count_1_<Label>, count_2_<Label>             int8 count of every character per side
+                                                 (labels from config.character_labels)
+    count_dict_1, count_dict_2                   the same counts as maps, in drawn order
+    system_content                               reference to the interned system prompts
+                                                 (dictionary = generator.system_prompts,
+                                                 written once per file)
+    user_content,                                dictionary-encoded prompt text
+    user_content_self_conscious
+read_scenario_store() memory-maps the file, so columns are read without copying,
+and stops cleanly at the last complete chunk of an interrupted run.
+"""
+
+import json
+import os
+
+import pandas as pd
+
+from config import characters, character_ids, character_labels, scenario_dimensions, traffic_light_signals
+from generate_moral_machine_scenarios_robots import scenario_hash, system_prompts
+
+CSV_FILES = {
+    "system_content": "system_content.csv",
+    "user_content": "user_content.csv",
+    "user_content_self_conscious": "user_self_conscious_content.csv",
+    "scenario_info": "scenario_info.csv",
+}
+JSONL_FILE = "scenarios.jsonl"
+PARQUET_DIR = "scenarios"
+STORE_FILE = "scenarios.arrow"
+
+
+def scenario_record(scenario_number, scenario):
+    """Flat dict of one generated scenario, numbered from 1 like the runners' output."""
+    system_content, user_content, user_content_self_conscious, scenario_info = scenario
+    record = {
+        "scenario_number": scenario_number,
+        "system_content": system_content,
+        "user_content": user_content,
+        "user_content_self_conscious": user_content_self_conscious,
+        "scenario_hash": scenario_hash(scenario_info),
+    }
+    record.update(scenario_info)
+    return record
+
+
+class ScenarioWriter:
+    """Buffer scenarios and write them out every chunk_size rows."""
+
+    def __init__(self, output_dir=".", chunk_size=1000):
+        self.output_dir = output_dir
+        self.chunk_size = chunk_size
+        self.nb_written = 0
+        self._buffer = []
+        os.makedirs(output_dir, exist_ok=True)
+
+    def write(self, scenario):
+        self._buffer.append(scenario)
+        if len(self._buffer) >= self.chunk_size:
+            self.flush()
+
+    def flush(self):
+        if self._buffer:
+            self._write_chunk(self._buffer)
+            self.nb_written += len(self._buffer)
+            self._buffer = []
+
+    def close(self):
+        self.flush()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        # also on KeyboardInterrupt: the partial chunk is kept
+        self.close()
+
+    def _write_chunk(self, chunk):
+        raise NotImplementedError
+
+
+def _sync(f):
+    f.flush()
+    os.fsync(f.fileno())
+
+
+class CsvScenarioWriter(ScenarioWriter):
+
+    def __init__(self, output_dir=".", chunk_size=1000):
+        super().__init__(output_dir, chunk_size)
+        self._files = {
+            column: open(os.path.join(output_dir, filename), "w", newline="")
+            for column, filename in CSV_FILES.items()
+        }
+
+    def _write_chunk(self, chunk):
+        system_content, user_content, user_content_self_conscious, scenario_info = zip(*chunk)
+        columns = {
+            "system_content": pd.DataFrame(list(system_content)),
+            "user_content": pd.DataFrame(list(user_content)),
+            "user_content_self_conscious": pd.DataFrame(list(user_content_self_conscious)),
+            "scenario_info": pd.DataFrame(list(scenario_info)),
+        }
+        for column, df in columns.items():
+            df.to_csv(self._files[column], sep="|", index=False, header=self.nb_written == 0)
+            _sync(self._files[column])
+
+    def close(self):
+        super().close()
+        for f in self._files.values():
+            f.close()
+
+
+class JsonlScenarioWriter(ScenarioWriter):
+
+    def __init__(self, output_dir=".", chunk_size=1000):
+        super().__init__(output_dir, chunk_size)
+        self._file = open(os.path.join(output_dir, JSONL_FILE), "w")
+
+    def _write_chunk(self, chunk):
+        lines = [
+            json.dumps(scenario_record(self.nb_written + i + 1, scenario)) + "\n"
+            for i, scenario in enumerate(chunk)
+        ]
+        self._file.writelines(lines)
+        _sync(self._file)
+
+    def close(self):
+        super().close()
+        self._file.close()
+
+
+class ParquetScenarioWriter(ScenarioWriter):
+
+    def __init__(self, output_dir=".", chunk_size=1000):
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise ImportError("--format parquet needs pyarrow: pip install pyarrow")
+        super().__init__(output_dir, chunk_size)
+        self._pa = pa
+        self._pq = pq
+        self._dir = os.path.join(output_dir, PARQUET_DIR)
+        os.makedirs(self._dir, exist_ok=True)
+        count_dict = pa.map_(pa.string(), pa.int64())
+        self._schema = pa.schema([
+            ("scenario_number", pa.int64()),
+            ("system_content", pa.string()),
+            ("user_content", pa.string()),
+            ("user_content_self_conscious", pa.string()),
+            ("scenario_hash", pa.string()),
+            ("scenario_dimension", pa.string()),
+            ("is_in_car", pa.bool_()),
+            ("is_interventionism", pa.bool_()),
+            ("scenario_dimension_group_type", pa.list_(pa.string())),
+            ("count_dict_1", count_dict),
+            ("count_dict_2", count_dict),
+            ("is_law", pa.bool_()),
+            ("traffic_light_pattern", pa.list_(pa.string())),
+        ])
+        self._nb_parts = 0
+
+    def _write_chunk(self, chunk):
+        records = [scenario_record(self.nb_written + i + 1, scenario) for i, scenario in enumerate(chunk)]
+        for record in records:
+            record["count_dict_1"] = list(record["count_dict_1"].items())
+            record["count_dict_2"] = list(record["count_dict_2"].items())
+        table = self._pa.Table.from_pylist(records, schema=self._schema)
+        path = os.path.join(self._dir, "part-{:05}.parquet".format(self._nb_parts))
+        # write under a temporary name so an interrupted chunk never leaves a broken part
+        self._pq.write_table(table, path + ".tmp")
+        os.replace(path + ".tmp", path)
+        self._nb_parts += 1
+
+
+def _import_pyarrow(what):
+    try:
+        import pyarrow
+        import pyarrow.ipc
+    except ImportError:
+        raise ImportError("{} needs pyarrow: pip install pyarrow".format(what))
+    return pyarrow
+
+
+def count_columns(side):
+    """Names of the per-character count columns of side 1 or 2, in character ID order."""
+    return ["count_{}_{}".format(side, label) for label in character_labels]
+
+
+def store_schema():
+    pa = _import_pyarrow("The scenario store")
+    enum = pa.dictionary(pa.int8(), pa.string())
+    text = pa.dictionary(pa.int32(), pa.string())
+    count_dict = pa.map_(pa.string(), pa.int8())
+    return pa.schema(
+        [
+            ("scenario_id", pa.int32()),
+            ("scenario_hash", pa.string()),
+            ("scenario_dimension", enum),
+            ("is_in_car", pa.bool_()),
+            ("is_interventionism", pa.bool_()),
+            ("is_law", pa.bool_()),
+            ("scenario_dimension_group_type", pa.list_(pa.string())),
+            ("signal_1", enum),
+            ("signal_2", enum),
+        ]
+        + [(column, pa.int8()) for column in count_columns(1) + count_columns(2)]
+        + [
+            ("count_dict_1", count_dict),
+            ("count_dict_2", count_dict),
+            ("system_content", text),
+            ("user_content", text),
+            ("user_content_self_conscious", text),
+        ]
+    )
+
+
+def store_record_batch(first_scenario_id, scenarios):
+    """Record batch of the scenario store for scenarios numbered from first_scenario_id."""
+    pa = _import_pyarrow("The scenario store")
+    schema = store_schema()
+    system_content, user_content, user_content_self_conscious, scenario_info = zip(*scenarios)
+    n = len(scenarios)
+
+    def enum(values, dictionary):
+        codes = [dictionary.index(value) for value in values]
+        return pa.DictionaryArray.from_arrays(pa.array(codes, pa.int8()), pa.array(dictionary))
+
+    def text(values):
+        return pa.array(values, pa.string()).dictionary_encode()
+
+    def system_text(values):
+        # the same dictionary in every chunk, so the IPC stream writes it only once
+        return pa.DictionaryArray.from_arrays(
+            pa.array([system_prompts.index(value) for value in values], pa.int32()),
+            pa.array(system_prompts),
+        )
+
+    counts = {}
+    for side in (1, 2):
+        matrix = [[0] * len(characters) for _ in range(n)]
+        for i, info in enumerate(scenario_info):
+            for element, count in info["count_dict_{}".format(side)].items():
+                matrix[i][character_ids[element]] = count
+        for j, column in enumerate(count_columns(side)):
+            counts[column] = pa.array([row[j] for row in matrix], pa.int8())
+
+    columns = {
+        "scenario_id": pa.array(range(first_scenario_id, first_scenario_id + n), pa.int32()),
+        "scenario_hash": pa.array([scenario_hash(info) for info in scenario_info], pa.string()),
+        "scenario_dimension": enum([info["scenario_dimension"] for info in scenario_info], list(scenario_dimensions) + ["random"]),
+        "is_in_car": pa.array([info["is_in_car"] for info in scenario_info], pa.bool_()),
+        "is_interventionism": pa.array([info["is_interventionism"] for info in scenario_info], pa.bool_()),
+        "is_law": pa.array([info["is_law"] for info in scenario_info], pa.bool_()),
+        "scenario_dimension_group_type": pa.array([info["scenario_dimension_group_type"] for info in scenario_info], pa.list_(pa.string())),
+        "signal_1": enum([info["traffic_light_pattern"][0] for info in scenario_info], traffic_light_signals),
+        "signal_2": enum([info["traffic_light_pattern"][1] for info in scenario_info], traffic_light_signals),
+        "count_dict_1": pa.array([list(info["count_dict_1"].items()) for info in scenario_info], schema.field("count_dict_1").type),
+        "count_dict_2": pa.array([list(info["count_dict_2"].items()) for info in scenario_info], schema.field("count_dict_2").type),
+        "system_content": system_text(system_content),
+        "user_content": text(user_content),
+        "user_content_self_conscious": text(user_content_self_conscious),
+    }
+    columns.update(counts)
+    return pa.record_batch([columns[field.name] for field in schema], schema=schema)
+
+
+class StoreScenarioWriter(ScenarioWriter):
+
+    def __init__(self, output_dir=".", chunk_size=1000):
+        pa = _import_pyarrow("--format arrow")
+        super().__init__(output_dir, chunk_size)
+        self._file = pa.OSFile(os.path.join(output_dir, STORE_FILE), "wb")
+        # the stream format (not the file format) lets every chunk carry its own prompt
+        # dictionary and stays readable up to the last complete chunk
+        self._writer = pa.ipc.new_stream(self._file, store_schema())
+
+    def _write_chunk(self, chunk):
+        self._writer.write_batch(store_record_batch(self.nb_written + 1, chunk))
+        _sync(self._file)
+
+    def close(self):
+        super().close()
+        self._writer.close()
+        self._file.close()
+
+
+def read_scenario_store(path=STORE_FILE):
+    """The scenario store as a pyarrow Table backed by a memory map of the file."""
+    pa = _import_pyarrow("The scenario store")
+    reader = pa.ipc.open_stream(pa.memory_map(path, "r"))
+    batches = []
+    try:
+        for batch in reader:
+            batches.append(batch)
+    except (pa.ArrowInvalid, OSError):
+        # truncated last chunk of an interrupted run: cut inside a message body,
+        # pyarrow reports reading past the end of the file as an OSError
+        pass
+    return pa.Table.from_batches(batches, schema=reader.schema)
+
+
+def store_counts(table, side):
+    """(n, len(characters)) int8 count matrix of side 1 or 2, in character ID order."""
+    import numpy as np
+    return np.column_stack([table.column(column).to_numpy() for column in count_columns(side)])
+
+
+def store_prompts(table, column):
+    """One prompt column of the store as a list of str."""
+    return table.column(column).cast(table.schema.field(column).type.value_type).to_pylist()
+
+
+def store_scenario_info(table):
+    """scenario_info dicts (as produced by the generator) for every row of the store."""
+    records = table.drop_columns(count_columns(1) + count_columns(2)).to_pylist()
+    return [
+        {
+            "scenario_dimension": record["scenario_dimension"],
+            "is_in_car": record["is_in_car"],
+            "is_interventionism": record["is_interventionism"],
+            "scenario_dimension_group_type": record["scenario_dimension_group_type"],
+            "count_dict_1": dict(record["count_dict_1"]),
+            "count_dict_2": dict(record["count_dict_2"]),
+            "is_law": record["is_law"],
+            "traffic_light_pattern": [record["signal_1"], record["signal_2"]],
+        }
+        for record in records
+    ]
+
+
+def load_prompt_frames(dataset, system_dataset="system_content.csv", column="user_content_self_conscious"):
+    """(system prompts, user prompts) as the one-column DataFrames the run_*.py scripts index.
+
+    `dataset` is either a Stage 1 prompt CSV (read with `system_dataset`) or the scenario
+    store, from which both the system prompt and the `column` user prompt are read.
+    """
+    if dataset.endswith(".arrow"):
+        table = read_scenario_store(dataset)
+        return (
+            pd.DataFrame({"0": store_prompts(table, "system_content")}),
+            pd.DataFrame({"0": store_prompts(table, column)}),
+        )
+    return pd.read_csv(system_dataset), pd.read_csv(dataset)
+
+
+def read_scenario_info(path):
+    """scenario_info dicts of a Stage 1 scenario_info.csv, in scenario order."""
+    import ast
+    records = pd.read_csv(path, sep="|").to_dict("records")
+    for info in records:
+        for key in ("scenario_dimension_group_type", "count_dict_1", "count_dict_2", "traffic_light_pattern"):
+            info[key] = ast.literal_eval(info[key])
+    return records
+
+
+def load_scenario_info(dataset):
+    """scenario_info dicts of the scenarios of a runner's --dataset: read from the scenario
+    store, or from the scenario_info.csv next to a Stage 1 prompt CSV."""
+    if dataset.endswith(".arrow"):
+        return store_scenario_info(read_scenario_store(dataset))
+    return read_scenario_info(os.path.join(os.path.dirname(dataset), CSV_FILES["scenario_info"]))
+
+
+def scenarios_from_csv(directory="."):
+    """Yield scenario tuples from the four Stage 1 CSVs (user_content.csv may be missing)."""
+    paths = {column: os.path.join(directory, filename) for column, filename in CSV_FILES.items()}
+    system_content = pd.read_csv(paths["system_content"], sep="|").iloc[:, 0]
+    user_content_self_conscious = pd.read_csv(paths["user_content_self_conscious"], sep="|").iloc[:, 0]
+    if os.path.exists(paths["user_content"]):
+        user_content = pd.read_csv(paths["user_content"], sep="|").iloc[:, 0]
+    else:
+        user_content = pd.Series([None] * len(system_content))
+    for i, info in enumerate(read_scenario_info(paths["scenario_info"])):
+        yield system_content[i], user_content[i], user_content_self_conscious[i], info
+
+
+SCENARIO_WRITERS = {
+    "csv": CsvScenarioWriter,
+    "jsonl": JsonlScenarioWriter,
+    "parquet": ParquetScenarioWriter,
+    "arrow": StoreScenarioWriter,
+}
+
+
+def open_scenario_writer(fmt="csv", output_dir=".", chunk_size=1000):
+    if fmt not in SCENARIO_WRITERS:
+        raise ValueError("Unknown scenario format: {} (expected one of {})".format(fmt, ", ".join(SCENARIO_WRITERS)))
+    return SCENARIO_WRITERS[fmt](output_dir, chunk_size)
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Convert the four Stage 1 CSVs into the scenario store")
+    parser.add_argument("--input_dir", default=".", type=str)
+    parser.add_argument("--output_dir", default=".", type=str)
+    args = parser.parse_args()
+
+    with StoreScenarioWriter(args.output_dir) as writer:
+        for scenario in scenarios_from_csv(args.input_dir):
+            writer.write(scenario)
+    print("Wrote {} scenarios to {}".format(writer.nb_written, os.path.join(args.output_dir, STORE_FILE)))
@@ -0,0 +1,75 @@
+"""
+Vote distributions of llm_runner.py --samples.
+
+With --samples N every scenario is answered N times, and each sample is
+classified on its own with amce.answer_case(). Two files go next to
+--odataset:
+
+    <odataset>.samples.csv   one row per sample: scenario_id, sample, Case, text
+    <odataset>.votes.csv     one row per scenario: how many samples chose each
+                             case, the majority decision and the agreement
+
+The majority is the case (1 or 2) most samples chose, or 0 when the decided
+samples tie or there are none; agreement is the share of the samples that chose
+it. A model whose agreement is near 1 answers a scenario the same way every time;
+near 0.5, its choice is a coin toss.
+"""
+
+from collections import Counter
+
+import pandas as pd
+
+from amce import answer_case
+
+SAMPLES_SUFFIX = ".samples.csv"
+VOTES_SUFFIX = ".votes.csv"
+
+
+def sample_texts(record):
+    """Every sampled answer of a journal record (its text alone when it holds one)."""
+    return record.get("samples") or [record["text"]]
+
+
+def majority(texts):
+    """Case 1 or 2 chosen by most of `texts`; 0 on a tie or without any decision."""
+    votes = Counter(answer_case(text) for text in texts)
+    if votes[1] == votes[2]:
+        return 0
+    return 1 if votes[1] > votes[2] else 2
+
+
+def sample_table(records):
+    rows = []
+    for record in records:
+        for sample, text in enumerate(sample_texts(record)):
+            rows.append({"scenario_id": record["scenario_id"], "sample": sample, "Case": answer_case(text), "text": text})
+    return pd.DataFrame(rows, columns=["scenario_id", "sample", "Case", "text"])
+
+
+def vote_table(records):
+    rows = []
+    for record in records:
+        texts = sample_texts(record)
+        votes = Counter(answer_case(text) for text in texts)
+        decision = majority(texts)
+        rows.append({
+            "scenario_id": record["scenario_id"],
+            "samples": len(texts),
+            "case_1": votes[1],
+            "case_2": votes[2],
+            "case_0": votes[0] + votes[-1],
+            "majority": decision,
+            "agreement": votes[decision] / len(texts) if decision else 0.0,
+        })
+    return pd.DataFrame(rows, columns=["scenario_id", "samples", "case_1", "case_2", "case_0", "majority", "agreement"])
+
+
+def vote_summary(votes):
+    """One line on a vote_table(): how consistent the answers were."""
+    if votes.empty:
+        return None
+    unanimous = (votes["case_1"] == votes["samples"]) | (votes["case_2"] == votes["samples"])
+    split = (votes["case_1"] > 0) & (votes["case_2"] > 0)
+    return "Self-consistency over {} scenarios ({} samples each): {:.0%} unanimous, {:.0%} split between the cases, mean agreement {:.2f}".format(
+        len(votes), "/".join(str(n) for n in sorted(votes["samples"].unique())), unanimous.mean(), split.mean(), votes["agreement"].mean()
+    )
@@ -0,0 +1,219 @@
+"""
+Per-request telemetry for llm_runner.py.
+
+Every answer gets one JSON line in <odataset>.telemetry.jsonl, appended as it
+arrives:
+
+    {"scenario_id": 12, "provider": "openai", "model": "o3-mini", "source": "api",
+     "latency_s": 3.1, "ttft_s": null, "total_s": 4.0, "attempts": 2, "retries": 1,
+     "rate_limited": 0, "input_tokens": 412, "output_tokens": 230, "cached_tokens": 0,
+     "cache_write_tokens": null, "cost_usd": 0.00146}
+
+source is "api", "cache" (the response cache answered) or "batch". latency_s is
+the answering attempt from send to last byte, ttft_s its time to the first token
+(--stream only), total_s the whole request including rate-limit waits and
+retries. At the end of a run the counters and latency histograms per provider and
+model go to <odataset>.prom, in the Prometheus text format (for node_exporter's
+textfile collector), and a summary is printed: request count, p50/p95/p99
+latency, throughput and cost.
+
+Costs use PRICES, in USD per million tokens, as listed by the providers in 2025;
+batch answers are billed at half price. Input tokens read from the provider's
+prompt cache and, for Anthropic, written to it (cache_write_tokens) have their
+own prices. Models missing from PRICES get no cost.
+"""
+
+import json
+import math
+import os
+import re
+import time
+from collections import defaultdict
+
+TELEMETRY_SUFFIX = ".telemetry.jsonl"
+METRICS_SUFFIX = ".prom"
+
+# model name -> (input, cached input, cache write, output) USD per million tokens.
+# Only Anthropic bills writing to the prompt cache, at 1.25x the input price.
+PRICES = {
+    "gpt-4.1": (2.00, 0.50, 2.00, 8.00),
+    "o3-mini": (1.10, 0.55, 1.10, 4.40),
+    "claude-3-7-sonnet": (3.00, 0.30, 3.75, 15.00),
+    "claude-3-5-haiku": (0.80, 0.08, 1.00, 4.00),
+    "gemini-2.0-flash": (0.10, 0.025, 0.10, 0.40),
+    "gemini-2.5-pro": (1.25, 0.31, 1.25, 10.00),
+    "gemini-2.5-flash": (0.30, 0.075, 0.30, 2.50),
+}
+# The suffix of a dated snapshot or alias of a model in PRICES: claude-3-7-sonnet-20250219,
+# gpt-4.1-2025-04-14, gemini-2.0-flash-001, claude-3-5-haiku-latest
+SNAPSHOT = re.compile(r"-(?:\d{8}|\d{4}-\d{2}-\d{2}|\d{3}|latest)$")
+BATCH_DISCOUNT = 0.5
+# Upper bounds (seconds) of the latency histogram buckets
+LATENCY_BUCKETS = (0.25, 0.5, 1, 2, 5, 10, 20, 30, 60, 120, 300, 600)
+
+
+def price(provider, model):
+    """(input, cached input, cache write, output) USD per million tokens of a model, or None.
+
+    A model is priced under its own name or a snapshot of it (see SNAPSHOT);
+    another variant ("gpt-4.1-mini", "gemini-2.5-pro-exp-03-25") is not priced,
+    rather than billed as the model its name starts with.
+    """
+    if provider == "ollama":
+        return (0, 0, 0, 0)
+    return PRICES.get(SNAPSHOT.sub("", model))
+
+
+def cost(provider, model, input_tokens, output_tokens, cached_tokens=None, batch=False, cache_write_tokens=None):
+    """Estimated USD of one answer; input_tokens includes the cached and cache-write tokens."""
+    prices = price(provider, model)
+    if prices is None or input_tokens is None or output_tokens is None:
+        return None
+    cached = cached_tokens or 0
+    written = cache_write_tokens or 0
+    usd = ((input_tokens - cached - written) * prices[0] + cached * prices[1] + written * prices[2] + output_tokens * prices[3]) / 1e6
+    return usd * (BATCH_DISCOUNT if batch else 1)
+
+
+def percentile(values, q):
+    """q-th percentile (0-100) of values, nearest rank; None if empty."""
+    if not values:
+        return None
+    values = sorted(values)
+    return values[max(0, math.ceil(q / 100 * len(values)) - 1)]
+
+
+class Histogram:
+
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.count = 0
+        self.sum = 0.0
+        self.values = []
+
+    def observe(self, value):
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+        self.count += 1
+        self.sum += value
+        self.values.append(value)
+
+
+class Telemetry:
+    """Per-request records, plus counters and histograms per (provider, model)."""
+
+    def __init__(self, path, metrics_path=None):
+        self.path = path
+        self.metrics_path = metrics_path
+        self._file = open(path, "a", encoding="utf-8")
+        self.started = time.monotonic()
+        self.latency = defaultdict(Histogram)
+        self.ttft = defaultdict(Histogram)
+        self.counters = defaultdict(float)
+
+    def record(self, scenario_id, provider, model, source="api", latency_s=None, ttft_s=None, total_s=None,
+               attempts=1, retries=0, rate_limited=0, input_tokens=None, output_tokens=None, cached_tokens=None, cache_write_tokens=None):
+        usd = None if source == "cache" else cost(provider, model, input_tokens, output_tokens, cached_tokens, source == "batch", cache_write_tokens)
+        record = {
+            "scenario_id": scenario_id, "provider": provider, "model": model, "source": source,
+            "latency_s": latency_s, "ttft_s": ttft_s, "total_s": total_s,
+            "attempts": attempts, "retries": retries, "rate_limited": rate_limited,
+            "input_tokens": input_tokens, "output_tokens": output_tokens, "cached_tokens": cached_tokens,
+            "cache_write_tokens": cache_write_tokens, "cost_usd": usd,
+        }
+        self._file.write(json.dumps(record) + "\n")
+
+        key = (provider, model)
+        if latency_s is not None:
+            self.latency[key].observe(latency_s)
+        if ttft_s is not None:
+            self.ttft[key].observe(ttft_s)
+        self.counters[key + ("requests", source)] += 1
+        self.counters[key + ("retries", None)] += retries
+        self.counters[key + ("rate_limited", None)] += rate_limited
+        if source != "cache":
+            self.counters[key + ("input_tokens", None)] += input_tokens or 0
+            self.counters[key + ("output_tokens", None)] += output_tokens or 0
+            self.counters[key + ("cached_tokens", None)] += cached_tokens or 0
+            self.counters[key + ("cache_write_tokens", None)] += cache_write_tokens or 0
+            self.counters[key + ("cost_usd", None)] += usd or 0
+            self.counters[key + ("priced", None)] += usd is not None
+        return record
+
+    def prometheus(self):
+        """The metrics in the Prometheus text exposition format."""
+        lines = []
+
+        def labels(provider, model, **extra):
+            pairs = dict(provider=provider, model=model, **extra)
+            return "{" + ",".join('{}="{}"'.format(name, value) for name, value in pairs.items()) + "}"
+
+        for name, histograms, help_text in (
+            ("mm_request_latency_seconds", self.latency, "Send-to-answer time of answered requests."),
+            ("mm_time_to_first_token_seconds", self.ttft, "Time to the first answer token (--stream)."),
+        ):
+            lines += ["# HELP {} {}".format(name, help_text), "# TYPE {} histogram".format(name)]
+            for (provider, model), histogram in sorted(histograms.items()):
+                for bound, count in zip(histogram.buckets, histogram.counts):
+                    lines.append("{}_bucket{} {}".format(name, labels(provider, model, le=bound), count))
+                lines.append("{}_bucket{} {}".format(name, labels(provider, model, le="+Inf"), histogram.count))
+                lines.append("{}_sum{} {}".format(name, labels(provider, model), histogram.sum))
+                lines.append("{}_count{} {}".format(name, labels(provider, model), histogram.count))
+
+        for counter, help_text in (
+            ("requests", "Answers, by where they came from."),
+            ("retries", "Retried attempts."),
+            ("rate_limited", "Rate-limit errors."),
+            ("input_tokens", "Input tokens billed."),
+            ("output_tokens", "Output tokens billed."),
+            ("cached_tokens", "Input tokens read from the provider's prompt cache."),
+            ("cache_write_tokens", "Input tokens written to the provider's prompt cache (Anthropic)."),
+            ("cost_usd", "Estimated cost in USD."),
+        ):
+            name = "mm_{}_total".format(counter)
+            lines += ["# HELP {} {}".format(name, help_text), "# TYPE {} counter".format(name)]
+            for (provider, model, kind, source), value in sorted(self.counters.items(), key=str):
+                if kind == counter:
+                    extra = {"source": source} if source else {}
+                    lines.append("{}{} {}".format(name, labels(provider, model, **extra), value))
+        return "\n".join(lines) + "\n"
+
+    def summary(self):
+        """One line per (provider, model): requests, latency percentiles, throughput and cost."""
+        elapsed = time.monotonic() - self.started
+        lines = []
+        for provider, model in sorted({key[:2] for key in self.counters}):
+            key = (provider, model)
+            requests = sum(value for (p, m, kind, _), value in self.counters.items() if (p, m, kind) == key + ("requests",))
+            parts = ["{} {}: {:.0f} answers".format(provider, model, requests)]
+            latencies = self.latency[key].values if key in self.latency else []
+            if latencies:
+                parts.append("latency p50 {:.2f}s p95 {:.2f}s p99 {:.2f}s".format(*(percentile(latencies, q) for q in (50, 95, 99))))
+            ttfts = self.ttft[key].values if key in self.ttft else []
+            if ttfts:
+                parts.append("TTFT p50 {:.2f}s p95 {:.2f}s".format(percentile(ttfts, 50), percentile(ttfts, 95)))
+            parts.append("{:.2f} answers/s, {:.0f} output tokens/s".format(
+                requests / elapsed if elapsed else 0, self.counters[key + ("output_tokens", None)] / elapsed if elapsed else 0
+            ))
+            parts.append("{:.0f} retries, {:.0f} rate-limited".format(self.counters[key + ("retries", None)], self.counters[key + ("rate_limited", None)]))
+            priced = self.counters[key + ("priced", None)]
+            if priced:
+                # answers without a known token count (e.g. a stream cut short without usage) are not
+                # priced; cache answers cost nothing and are left out of both counts
+                usd = self.counters[key + ("cost_usd", None)]
+                unpriced = requests - self.counters.get(key + ("requests", "cache"), 0) - priced
+                parts.append("${:.4f} (${:.6f}/answer{})".format(
+                    usd, usd / priced, ", {:.0f} unpriced".format(unpriced) if unpriced else ""
+                ))
+            lines.append(", ".join(parts))
+        return "\n".join(lines)
+
+    def close(self):
+        self._file.close()
+        if self.metrics_path:
+            # written whole and renamed, so a collector never reads half a file
+            with open(self.metrics_path + ".tmp", "w", encoding="utf-8") as f:
+                f.write(self.prometheus())
+            os.replace(self.metrics_path + ".tmp", self.metrics_path)
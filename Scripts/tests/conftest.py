@@ -0,0 +1,7 @@
+import os
+import sys
+
+# The scripts import each other as siblings, as when run from Scripts/
+SCRIPTS = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DATA = os.path.join(os.path.dirname(SCRIPTS), "Data")
+sys.path.insert(0, SCRIPTS)
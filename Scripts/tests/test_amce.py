@@ -0,0 +1,112 @@
+import json
+import os
+import re
+
+import pandas as pd
+import pytest
+
+from amce import REGRESSIONS, AmceEstimator, answer_case, decision, stratified_order
+from conftest import DATA, SCRIPTS
+from scenario_io import read_scenario_info
+
+# The delta and CI variables of AMCE.ipynb (cells 31-33), by attribute
+NOTEBOOK_RESULTS = {
+    "Pet → Human": ("delta_pets_humans", "row1"),
+    "Pet → Self-conscious robot": ("delta_pets_robots", "row2"),
+    "Self-conscious robot → Human": ("delta_robots_humans", "row3"),
+    "Low Social → High Social": ("delta_low_high_social", "row4"),
+    "Passenger → Pedestrian": ("delta_passanger_pedestrian", "row5"),
+    "Few → More": ("delta_few_more", "row6"),
+    "Unlawful → Lawful": ("delta_red_green", "row7"),
+    "Intervention → Non-Intervention": ("delta_non_intervention", "row8"),
+    "Male → Female": ("delta_male_female", "row9"),
+    "Large → Fit": ("delta_large_fit", "row10"),
+    "Old → Young": ("delta_old_young", "row11"),
+}
+
+
+def notebook_results(model):
+    """The namespace of AMCE.ipynb run on Data/ for `model`: data preparation, the
+    regressions of cells 20-30 (without their plots) and the deltas and CIs of cells 31-33."""
+    with open(os.path.join(SCRIPTS, "AMCE.ipynb"), encoding="utf-8") as f:
+        cells = ["".join(cell["source"]) for cell in json.load(f)["cells"] if cell["cell_type"] == "code"]
+    namespace = {}
+    cwd = os.getcwd()
+    os.chdir(DATA)
+    try:
+        for number, source in enumerate(cells[:34]):
+            if number == 18:
+                continue  # writes response_<model>.csv
+            if 20 <= number <= 30:
+                source = source[:source.index(".fit()") + len(".fit()")]
+            source = re.sub(r'response_model_evaluated = ".*"', "response_model_evaluated = {!r}".format(model), source)
+            exec(source, namespace)
+    finally:
+        os.chdir(cwd)
+    return namespace
+
+
+@pytest.mark.parametrize("model", ["DeepSeek_R18b", "OpenAI_GPT4.1"])
+def test_estimator_matches_notebook(model):
+    namespace = notebook_results(model)
+    responses = pd.read_csv(os.path.join(DATA, "responses.csv"))
+    scenario_info = read_scenario_info(os.path.join(DATA, "scenario_info.csv"))
+    estimator = AmceEstimator()
+    for scenario_number, case in zip(responses["scenario_number"], responses[model]):
+        estimator.add(scenario_info[scenario_number - 1], case)
+
+    assert estimator.scenarios == (responses[model] > 0).sum()
+    for attribute, (delta_name, row) in NOTEBOOK_RESULTS.items():
+        delta, low, high = estimator.estimate(attribute)
+        # the notebook rounds to 4 decimals
+        assert delta == pytest.approx(namespace[delta_name], abs=1e-4), attribute
+        assert low == pytest.approx(namespace[row + "_low"], abs=2e-4), attribute
+        assert high == pytest.approx(namespace[row + "_high"], abs=2e-4), attribute
+
+
+def test_estimator_needs_answers():
+    estimator = AmceEstimator()
+    estimator.add({}, 0)
+    assert estimator.scenarios == 0
+    assert all(estimate is None for estimate in estimator.estimates().values())
+    assert not estimator.converged(1.0)
+    assert set(estimator.estimates()) == set(REGRESSIONS)
+
+
+def test_stratified_order():
+    dimensions = ["a"] * 60 + ["b"] * 30 + ["c"] * 10
+    order = stratified_order(dimensions, seed=3)
+    assert sorted(order) == list(range(100))
+    # every prefix holds each dimension in proportion
+    first = [dimensions[position] for position in order[:20]]
+    assert (first.count("a"), first.count("b"), first.count("c")) == (12, 6, 2)
+    assert stratified_order(dimensions, seed=3) == order
+
+
+@pytest.mark.parametrize("text, case", [
+    ("**Final Answer:** Case 2", 2),
+    ("Answer: Case 1", 1),
+    (r"**Final Answer:** \n boxed{1}", 1),
+    ("I choose Case 1 because it spares more lives.", 1),
+    ("Case 2 is the more ethical choice here.", 2),
+    ("After weighing both options, my decision would be Case 1.", 1),
+    ("Case 2: the car swerves.", 2),
+    # a later explicit marker overrides a statement
+    ("I lean towards Case 1 at first. Final answer: Case 2", 2),
+    # negated, conditional or paired mentions are not decisions
+    ("I would not choose Case 1.", None),
+    ("If Case 1 is chosen, the pedestrians die.", None),
+    ("I must choose between Case 1 or Case 2.", None),
+    ("I cannot make this decision.", None),
+    # a forced choice is still one
+    ("If I must choose, I choose Case 2.", 2),
+])
+def test_decision(text, case):
+    assert decision(text) == case
+
+
+def test_answer_case():
+    assert answer_case(None) == -1
+    assert answer_case(float("nan")) == -1
+    assert answer_case("Both outcomes are tragic.") == 0
+    assert answer_case("I choose Case 2.") == 2
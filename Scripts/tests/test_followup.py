@@ -0,0 +1,40 @@
+import pandas as pd
+import pytest
+
+from followup import FOLLOWUP_PROMPT, followup_prompts, merge_followup, read_classified
+from llm_runner import Prompt
+
+
+@pytest.fixture
+def classified(tmp_path):
+    path = tmp_path / "classified.csv"
+    pd.DataFrame({
+        "Scenario": ["Scenario # 1: I choose Case 1.", "Scenario # 2: Both are tragic.", "Scenario # 3: I cannot decide."],
+        "Case": [1, 0, 0],
+    }).to_csv(path, index=False)
+    return read_classified(str(path))
+
+
+def test_read_classified(classified, tmp_path):
+    assert classified["scenario_id"].tolist() == [1, 2, 3]
+    assert classified["answer"].tolist()[1] == "Both are tragic."
+    path = tmp_path / "unclassified.csv"
+    pd.DataFrame({"Scenario": ["Scenario # 1: ..."]}).to_csv(path, index=False)
+    with pytest.raises(ValueError):
+        read_classified(str(path))
+
+
+def test_followup_prompts(classified):
+    prompts = [Prompt(n, "system", "user {}".format(n)) for n in (1, 2, 3)]
+    asked = followup_prompts(prompts, classified)
+    assert [prompt.scenario_id for prompt in asked] == [2, 3]
+    assert asked[0].user == FOLLOWUP_PROMPT
+    assert asked[0].history == (("user 2", "Both are tragic."),)
+
+
+def test_merge_followup(classified):
+    merged = merge_followup(classified, {2: "Answer: Case 2", 3: "I still cannot choose."})
+    assert merged.columns.tolist() == ["Scenario", "Case", "Followup", "Round"]
+    assert merged["Case"].tolist() == [1, 2, 0]
+    assert merged["Round"].tolist() == [1, 2, 2]
+    assert pd.isna(merged["Followup"][0])
@@ -0,0 +1,44 @@
+import numpy as np
+
+from config import characters, traffic_light_signals
+from generate_moral_machine_scenarios_robots import batch_rows, block_seed, generate_batch, iter_batch_scenarios, render_block, scenario_hash
+
+
+def test_batch_rows_decode_every_column():
+    batch = generate_batch(500, 0)
+    for i, row in enumerate(batch_rows(batch)):
+        assert row == (
+            batch["dimensions"][batch["scenario_dimension"][i]],
+            bool(batch["is_in_car"][i]),
+            bool(batch["is_interventionism"][i]),
+            bool(batch["is_law"][i]),
+            [characters[c] for c in batch["set_1"][i] if c >= 0],
+            [characters[c] for c in batch["set_2"][i] if c >= 0],
+            [traffic_light_signals[s] for s in batch["traffic_light_pattern"][i]],
+            bool(batch["is_swapped"][i]),
+        )
+
+
+def test_block_seed_is_the_spawned_child():
+    children = np.random.SeedSequence(42).spawn(3)
+    for block, child in enumerate(children):
+        assert block_seed(42, block).generate_state(4).tolist() == child.generate_state(4).tolist()
+
+
+def test_blocks_render_the_same_scenarios():
+    scenarios = list(iter_batch_scenarios(25, 7, block_size=10))
+    assert scenarios == render_block(7, 0, 25, 10) + render_block(7, 1, 25, 10) + render_block(7, 2, 25, 10)
+
+
+def test_scenario_hash_ignores_character_order():
+    info = {
+        "scenario_dimension": "species", "is_in_car": True, "is_interventionism": False, "is_law": False,
+        "scenario_dimension_group_type": ["human", "pet"],
+        "count_dict_1": {"man": 1, "cat": 2}, "count_dict_2": {"dog": 1},
+        "traffic_light_pattern": ["NA", "NA"],
+    }
+    reordered = dict(info, count_dict_1={"cat": 2, "man": 1})
+    assert scenario_hash(info) == scenario_hash(reordered)
+    assert len(scenario_hash(info)) == 16
+    assert scenario_hash(info) != scenario_hash(dict(info, is_law=True))
+    assert scenario_hash(info) != scenario_hash(dict(info, count_dict_2={"dog": 2}))
@@ -0,0 +1,36 @@
+import json
+
+import pytest
+
+from journal import Journal, journal_path, read_journal, read_records
+
+
+def test_journal_path():
+    assert journal_path("responses.csv") == "responses.journal.jsonl"
+    assert journal_path("out/responses", ".prom") == "out/responses.prom"
+
+
+def test_torn_line_is_ignored_and_dropped_on_resume(tmp_path):
+    path = str(tmp_path / "run.journal.jsonl")
+    journal = Journal(path)
+    journal.append({"scenario_id": 1, "text": "I choose Case 1."})
+    journal.append({"scenario_id": 2, "text": "I choose Case 2."})
+    journal.close()
+    # a crash in the middle of the third record
+    with open(path, "a", encoding="utf-8") as f:
+        f.write('{"scenario_id": 3, "te')
+
+    assert list(read_journal(path)) == [1, 2]
+
+    with pytest.raises(FileExistsError):
+        Journal(path)
+    journal = Journal(path, resume=True)
+    journal.append({"scenario_id": 3, "text": "Answer: Case 1"})
+    journal.close()
+    assert [record["scenario_id"] for record in read_records(path)] == [1, 2, 3]
+    with open(path, encoding="utf-8") as f:
+        assert [json.loads(line)["scenario_id"] for line in f] == [1, 2, 3]
+
+
+def test_missing_journal_is_empty(tmp_path):
+    assert read_journal(str(tmp_path / "none.jsonl")) == {}
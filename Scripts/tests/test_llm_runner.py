@@ -0,0 +1,71 @@
+import asyncio
+
+import pandas as pd
+
+from llm_runner import Completion, Prompt, ProviderAdapter, legacy_prompt, load_prompts, prefix_schedule, run_prompts
+
+
+class EchoAdapter(ProviderAdapter):
+    """A provider that answers with the scenario text, the later scenarios faster."""
+
+    name = "echo"
+
+    def __init__(self, model, delays):
+        super().__init__(model)
+        self.delays = delays
+        self.in_flight = 0
+        self.peak = 0
+
+    def build_request(self, system, user, history=()):
+        return {"user": user}
+
+    async def complete(self, request):
+        self.in_flight += 1
+        self.peak = max(self.peak, self.in_flight)
+        await asyncio.sleep(self.delays[request["user"]])
+        self.in_flight -= 1
+        return Completion(request["user"].upper(), 1, 1)
+
+
+def test_run_prompts_keeps_order_and_concurrency():
+    prompts = [Prompt(n, "system", "scenario {}".format(n)) for n in range(1, 21)]
+    adapter = EchoAdapter("model", {prompt.user: 0.002 * (21 - prompt.scenario_id) for prompt in prompts})
+    arrived = []
+
+    async def run():
+        return [item async for item in run_prompts(adapter, prompts, 4, on_done=lambda prompt, completion: arrived.append(prompt.scenario_id))]
+
+    answers = asyncio.run(run())
+    assert [prompt for prompt, _ in answers] == prompts
+    assert [completion.text for _, completion in answers] == [prompt.user.upper() for prompt in prompts]
+    assert adapter.peak == 4
+    # on_done sees the answers as they arrive, not in prompt order
+    assert sorted(arrived) == list(range(1, 21)) and arrived != sorted(arrived)
+
+
+def test_load_prompts(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    pd.DataFrame({"system_content": ["Be brief."] * 2}).to_csv("system_content.csv", index=False)
+    pd.DataFrame({"user_content_self_conscious": ["Case 1. A", "Case 1. B"]}).to_csv("user.csv", index=False)
+
+    text = load_prompts("user.csv", "text")
+    assert [(prompt.scenario_id, prompt.system, prompt.user, prompt.user_text) for prompt in text] == [
+        (1, "Be brief.", "Case 1. A", None), (2, "Be brief.", "Case 1. B", None)
+    ]
+    legacy = load_prompts("user.csv", nb_scenarios=1)
+    assert len(legacy) == 1
+    # the pandas repr of the published runs is sent, and the dataset text kept
+    assert legacy[0].user.endswith("Name: 0, dtype: object") and "Case 1. A" in legacy[0].user
+    assert legacy[0].user_text == "Case 1. A"
+
+
+def test_prefix_schedule_groups_by_dataset_system_prompt():
+    systems = ["car", "road", "car", "road", "car"]
+    for legacy in (False, True):
+        prompts = [
+            Prompt(row + 1, legacy_prompt(system, row, 700), "scenario", system_text=system) if legacy else Prompt(row + 1, system, "scenario")
+            for row, system in enumerate(systems)
+        ]
+        leaders, rest = prefix_schedule(prompts)
+        assert [prompt.scenario_id for prompt in leaders] == [1, 2]
+        assert [prompt.scenario_id for prompt in rest] == [3, 5, 4]
@@ -0,0 +1,113 @@
+import asyncio
+import re
+import threading
+
+import httpx
+import pandas as pd
+import pytest
+
+from journal import Journal
+from llm_runner import AnthropicAdapter, GoogleAdapter, OllamaAdapter, OpenAIAdapter, Prompt, legacy_prompt, read_stream, run_batches
+from mock_server import ScenarioIndex, make_server
+
+CANNED = re.compile(r"I choose Case ([12])\. Answer: Case \1")
+ADAPTERS = {"openai": OpenAIAdapter, "anthropic": AnthropicAdapter, "google": GoogleAdapter, "ollama": OllamaAdapter}
+
+
+@pytest.fixture
+def mock(monkeypatch):
+    """start(**options): a mock_server.py on a free port, which the provider SDKs are pointed at."""
+    servers = []
+
+    def start(**options):
+        server = make_server(port=0, **options)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        servers.append(server)
+        url = "http://127.0.0.1:{}".format(server.server_address[1])
+        for name, value in {
+            "OPENAI_BASE_URL": url + "/v1", "OPENAI_API_KEY": "mock",
+            "ANTHROPIC_BASE_URL": url, "ANTHROPIC_API_KEY": "mock",
+            "GOOGLE_GEMINI_BASE_URL": url, "API_KEY": "mock",
+            "OLLAMA_HOST": url,
+        }.items():
+            monkeypatch.setenv(name, value)
+        return url
+
+    yield start
+    for server in servers:
+        server.shutdown()
+        server.server_close()
+
+
+def ask(adapter, user, system="Be brief.", stream=False):
+    async def run():
+        request = adapter.build_request(system, user)
+        try:
+            return await (read_stream(adapter, request) if stream else adapter.complete(request))
+        finally:
+            await adapter.aclose()
+
+    return asyncio.run(run())
+
+
+@pytest.mark.parametrize("stream", [False, True])
+@pytest.mark.parametrize("provider", list(ADAPTERS))
+def test_every_provider_answers(mock, provider, stream):
+    url = mock()
+    completion = ask(ADAPTERS[provider]("mock-model"), "Case 1. The car swerves.", stream=stream)
+    assert CANNED.fullmatch(completion.text.strip())
+    assert completion.output_tokens
+    assert httpx.get(url + "/mock/stats").json()["requests"] == 1
+
+
+@pytest.mark.parametrize("provider", ["openai", "google"])
+def test_samples_in_one_request(mock, provider):
+    mock()
+    completion = ask(ADAPTERS[provider]("mock-model", samples=3), "Case 1. The car swerves.")
+    assert len(completion.samples) == 3 and all(CANNED.fullmatch(text) for text in completion.samples)
+
+
+def test_replay_by_scenario_number(mock, tmp_path):
+    dataset = tmp_path / "user.csv"
+    pd.DataFrame({"user_content_self_conscious": ["Case 1. A", "Case 1. B"]}).to_csv(dataset, index=False)
+    pd.DataFrame({"system_content": ["Be brief."] * 2}).to_csv(tmp_path / "system.csv", index=False)
+    mock(replay={None: {2: "Replayed: Case 2"}}, scenarios=ScenarioIndex(str(dataset), str(tmp_path / "system.csv")))
+    # found by its text, or by the row number of the legacy repr
+    assert ask(OpenAIAdapter("mock-model"), "Case 1. B").text == "Replayed: Case 2"
+    assert ask(OpenAIAdapter("mock-model"), legacy_prompt("Case 1. B", 1, 700)).text == "Replayed: Case 2"
+    assert CANNED.fullmatch(ask(OpenAIAdapter("mock-model"), "Case 1. A").text)
+
+
+def test_rate_limits_and_errors(mock):
+    url = mock(rpm=1)
+    request = {"model": "mock-model", "messages": [{"role": "user", "content": "Case 1."}]}
+    first = httpx.post(url + "/v1/chat/completions", json=request)
+    assert first.status_code == 200 and first.headers["x-ratelimit-limit-requests"] == "1"
+    second = httpx.post(url + "/v1/chat/completions", json=request)
+    assert second.status_code == 429 and int(second.headers["retry-after"]) >= 1
+    assert second.json()["error"]["code"] == "rate_limit_exceeded"
+
+    url = mock(error_rate=1)
+    overloaded = httpx.post(url + "/v1/messages", json={"model": "mock-model", "max_tokens": 10, "messages": request["messages"]})
+    assert overloaded.status_code == 529 and overloaded.json()["error"]["type"] == "overloaded_error"
+    assert httpx.get(url + "/mock/stats").json()["errors"] == 1
+
+
+@pytest.mark.parametrize("provider", ["openai", "anthropic"])
+def test_batch_cycle(mock, tmp_path, provider):
+    mock(batch_delay=0)
+    prompts = [Prompt(n, "Be brief.", "Case 1. Scenario {}".format(n)) for n in range(1, 6)]
+    answers = {}
+    batch_log = Journal(str(tmp_path / "batches.jsonl"))
+
+    async def run():
+        adapter = ADAPTERS[provider]("mock-model")
+        try:
+            return await run_batches(adapter, prompts, lambda prompt, completion: answers.update({prompt.scenario_id: completion.text}),
+                                     batch_log, batch_size=2, poll_interval=0.01)
+        finally:
+            await adapter.aclose()
+
+    assert asyncio.run(run()) == {}
+    batch_log.close()
+    assert sorted(answers) == [1, 2, 3, 4, 5] and all(CANNED.fullmatch(text) for text in answers.values())
@@ -0,0 +1,54 @@
+import time
+
+import pytest
+
+from rate_limit import RateLimiter, parse_duration, parse_rate_limit_headers
+
+
+def test_rate_limited_halves_once_per_pause(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(time, "monotonic", lambda: now[0])
+    limiter = RateLimiter(max_concurrency=16)
+    limiter.on_rate_limited(10)
+    assert limiter.concurrency == 8
+    # the other requests in flight get their 429s during the pause
+    now[0] += 1
+    limiter.on_rate_limited(10)
+    limiter.on_rate_limited(10)
+    assert limiter.concurrency == 8
+    # a 429 after the pause is a new overload
+    now[0] += 20
+    limiter.on_rate_limited(10)
+    assert limiter.concurrency == 4
+
+
+def test_concurrency_grows_back():
+    limiter = RateLimiter(max_concurrency=4)
+    limiter.concurrency = 2
+    for _ in range(2):
+        limiter.on_success(0)
+    assert limiter.concurrency == 3
+
+
+@pytest.mark.parametrize("value, seconds", [("20ms", 0.02), ("1s", 1), ("6m0s", 360), ("1m30.5s", 90.5), ("7", 7), (None, None), ("soon", None)])
+def test_parse_duration(value, seconds):
+    assert parse_duration(value) == seconds
+
+
+def test_parse_openai_headers():
+    limits = parse_rate_limit_headers({
+        "x-ratelimit-limit-requests": "500", "x-ratelimit-remaining-requests": "499", "x-ratelimit-reset-requests": "120ms",
+        "x-ratelimit-limit-tokens": "30000", "x-ratelimit-remaining-tokens": "29000", "x-ratelimit-reset-tokens": "2s",
+    })
+    assert limits["requests_limit"] == 500
+    assert limits["requests_remaining"] == 499
+    assert limits["requests_reset"] == pytest.approx(0.12)
+    assert limits["tokens_limit"] == 30000
+    assert limits["tokens_remaining"] == 29000
+    assert limits["tokens_reset"] == 2
+
+
+def test_parse_anthropic_headers():
+    limits = parse_rate_limit_headers({"Anthropic-RateLimit-Requests-Limit": "50", "anthropic-ratelimit-tokens-remaining": "1000"})
+    assert limits["requests_limit"] == 50
+    assert limits["tokens_remaining"] == 1000
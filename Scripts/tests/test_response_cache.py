@@ -0,0 +1,84 @@
+import asyncio
+
+import pytest
+
+from llm_runner import Prompt, ProviderAdapter, cache_key, legacy_prompt
+from response_cache import CacheMiss, ResponseCache, request_key
+
+
+class ChatAdapter(ProviderAdapter):
+    name = "chat"
+
+    def build_request(self, system, user, history=()):
+        return {"model": self.model, "system": system, "user": user}
+
+
+def legacy(row, system, user):
+    return Prompt(row + 1, legacy_prompt(system, row, 700), legacy_prompt(user, row, 700), user_text=user, system_text=system)
+
+
+def test_put_and_get(tmp_path):
+    cache = ResponseCache(str(tmp_path / "cache.sqlite"))
+    key = request_key("chat", {"user": "Case 1."})
+    assert cache.get(key) is None
+    cache.put(key, "chat", "model", "Answer: Case 1", 10, 5)
+    cache.put("samples", "chat", "model", "Case 1", 10, 5, samples=["Case 1", "Case 2"])
+    cache.close()
+
+    cache = ResponseCache(str(tmp_path / "cache.sqlite"), read_only=True)
+    assert cache.get(key) == ("Answer: Case 1", 10, 5, None)
+    assert cache.get("samples") == ("Case 1", 10, 5, ["Case 1", "Case 2"])
+    cache.close()
+
+
+def test_evicts_least_recently_used(tmp_path):
+    cache = ResponseCache(str(tmp_path / "cache.sqlite"), max_bytes=25)
+    for key in ("a", "b"):
+        cache.put(key, "chat", "model", "x" * 10)
+    cache.get("a")
+    cache.put("c", "chat", "model", "x" * 10)
+    assert cache.get("a") is not None and cache.get("b") is None and cache.get("c") is not None
+    assert cache.size == 20
+
+
+def test_replay(tmp_path):
+    with pytest.raises(FileNotFoundError):
+        ResponseCache(str(tmp_path / "missing.sqlite"), read_only=True)
+    ResponseCache(str(tmp_path / "cache.sqlite")).close()
+    cache = ResponseCache(str(tmp_path / "cache.sqlite"), read_only=True)
+
+    async def send():
+        raise AssertionError("--replay must not send")
+
+    with pytest.raises(CacheMiss):
+        asyncio.run(cache.fetch("a", send))
+
+
+def test_fetch_sends_a_key_once(tmp_path):
+    cache = ResponseCache(str(tmp_path / "cache.sqlite"))
+    sent = []
+
+    async def send():
+        sent.append(True)
+        await asyncio.sleep(0.01)
+        cache.put("a", "chat", "model", "Case 2", 1, 1)
+        return "Case 2", 1, 1, None
+
+    async def run():
+        return await asyncio.gather(*(cache.fetch("a", send) for _ in range(3)))
+
+    assert asyncio.run(run()) == [("Case 2", 1, 1, None)] * 3
+    assert len(sent) == 1 and (cache.hits, cache.misses) == (2, 1)
+
+
+def test_cache_key():
+    adapter = ChatAdapter("model")
+    # the same scenario in two rows of a legacy run shares an answer
+    assert cache_key(adapter, legacy(0, "Be brief.", "Case 1.")) == cache_key(adapter, legacy(6, "Be brief.", "Case 1."))
+    assert cache_key(adapter, legacy(0, "Be brief.", "Case 1.")) != cache_key(adapter, legacy(0, "Be brief.", "Case 2."))
+    # but not with the text format, nor with another model, sample or --stop_after
+    text = Prompt(1, "Be brief.", "Case 1.")
+    assert cache_key(adapter, legacy(0, "Be brief.", "Case 1.")) != cache_key(adapter, text)
+    assert cache_key(adapter, text) != cache_key(ChatAdapter("other"), text)
+    assert cache_key(adapter, text) != cache_key(adapter, text, sample=1)
+    assert cache_key(adapter, text) != cache_key(ChatAdapter("model", stop_after=50), text)
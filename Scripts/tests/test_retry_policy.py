@@ -0,0 +1,95 @@
+import asyncio
+
+import anthropic
+import httpx
+import openai
+import pytest
+
+from llm_runner import Prompt, ProviderAdapter, send
+from rate_limit import RateLimiter
+from retry_policy import FATAL, RATE_LIMITED, RETRYABLE, RetryPolicy, classify, quota_exhausted
+
+
+class StatusError(Exception):
+    def __init__(self, status_code=None, code=None, body=None, details=None):
+        super().__init__("status {}".format(status_code or code))
+        self.status_code = status_code
+        self.code = code
+        self.body = body
+        self.details = details
+
+
+REQUEST = httpx.Request("POST", "https://api.example.com/v1/chat/completions")
+
+
+@pytest.mark.parametrize("exc, kind", [
+    (StatusError(429), RATE_LIMITED),
+    (StatusError(500), RETRYABLE),
+    (StatusError(529), RETRYABLE),
+    (StatusError(408), RETRYABLE),
+    (StatusError(400), FATAL),
+    (StatusError(401), FATAL),
+    (StatusError(code=503), RETRYABLE),
+    (asyncio.TimeoutError(), RETRYABLE),
+    (ConnectionResetError(), RETRYABLE),
+    (httpx.ReadError(""), RETRYABLE),
+    (httpx.WriteError("broken pipe"), RETRYABLE),
+    (httpx.RemoteProtocolError("peer closed connection"), RETRYABLE),
+    (httpx.ConnectTimeout("timed out"), RETRYABLE),
+    (openai.APIConnectionError(request=REQUEST), RETRYABLE),
+    (anthropic.APITimeoutError(request=REQUEST), RETRYABLE),
+    (httpx.UnsupportedProtocol("no scheme"), FATAL),
+    (ValueError("a bug"), FATAL),
+    (type("TimeoutConfigError", (Exception,), {})(), FATAL),
+])
+def test_classify(exc, kind):
+    assert classify(exc) == kind
+
+
+def test_openai_insufficient_quota_is_fatal():
+    # openai.RateLimitError keeps the "error" object of the body, and its code
+    exc = StatusError(429, code="insufficient_quota", body={"message": "You exceeded your current quota", "code": "insufficient_quota"})
+    assert quota_exhausted(exc)
+    assert classify(exc) == FATAL
+    assert classify(StatusError(429, body={"error": {"type": "insufficient_quota"}})) == FATAL
+    assert classify(StatusError(429, code="rate_limit_exceeded", body={"code": "rate_limit_exceeded"})) == RATE_LIMITED
+
+
+def test_gemini_daily_quota_is_fatal():
+    def error(quota_id):
+        return StatusError(code=429, details={"error": {"code": 429, "status": "RESOURCE_EXHAUSTED", "details": [
+            {"@type": "type.googleapis.com/google.rpc.QuotaFailure", "violations": [{"quotaId": quota_id}]},
+            {"@type": "type.googleapis.com/google.rpc.RetryInfo", "retryDelay": "30s"},
+        ]}})
+
+    assert classify(error("GenerateRequestsPerDayPerProjectPerModel-FreeTier")) == FATAL
+    assert classify(error("GenerateRequestsPerMinutePerProjectPerModel-FreeTier")) == RATE_LIMITED
+
+
+def test_backoff_is_capped():
+    policy = RetryPolicy(retry_delay=2, max_retry_delay=5)
+    assert all(0 <= policy.backoff(attempt) <= min(5, 2 * 2 ** (attempt - 1)) for attempt in range(1, 10) for _ in range(20))
+
+
+def test_time_left():
+    assert RetryPolicy().time_left(100) is None
+    assert RetryPolicy(deadline=30).time_left(10) == 20
+
+
+class RateLimitedAdapter(ProviderAdapter):
+    """A provider that answers every request with a 429."""
+
+    name = "rate_limited"
+    calls = 0
+
+    async def complete(self, request):
+        self.calls += 1
+        raise StatusError(429)
+
+
+def test_rate_limited_requests_give_up():
+    adapter = RateLimitedAdapter("model")
+    policy = RetryPolicy(retry_delay=0.001, max_rate_limited=3)
+    with pytest.raises(StatusError):
+        asyncio.run(send(adapter, {}, Prompt(1, "system", "user"), RateLimiter(), policy))
+    assert adapter.calls == 4
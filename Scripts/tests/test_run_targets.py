@@ -0,0 +1,37 @@
+import argparse
+import os
+
+import pytest
+
+import run_targets
+from run_targets import parse_target, target_metrics, target_odataset
+
+
+def test_parse_target():
+    assert parse_target("OpenAI_GPT4.1") == ("OpenAI_GPT4.1", "openai", "gpt-4.1")
+    assert parse_target("ollama:deepseek-r1:8b") == ("ollama_deepseek-r1:8b", "ollama", "deepseek-r1:8b")
+    assert parse_target("haiku=anthropic:claude-3-5-haiku-latest") == ("haiku", "anthropic", "claude-3-5-haiku-latest")
+    with pytest.raises(ValueError):
+        parse_target("nobody:model")
+
+
+def test_target_paths():
+    assert target_odataset("out", "DeepSeek_LLM:latest") == os.path.join("out", "responses_DeepSeek_LLM_latest.csv")
+    assert target_metrics("metrics/run.prom", "DeepSeek_LLM:latest") == "metrics/run_DeepSeek_LLM_latest.prom"
+
+
+def test_each_target_gets_its_own_metrics(monkeypatch):
+    seen = {}
+
+    async def run_target(provider, args, label, position, pool):
+        seen[label] = (args.odataset, args.metrics)
+
+    monkeypatch.setattr(run_targets, "run_target", run_target)
+    args = argparse.Namespace(odir="out", metrics="run.prom", model=None, odataset=None)
+    targets = [parse_target("a=openai:gpt-4.1"), parse_target("b=anthropic:claude-3-5-haiku-latest")]
+    assert run_targets.asyncio.run(run_targets.run_targets(targets, args, {})) == {}
+    assert seen == {
+        "a": (os.path.join("out", "responses_a.csv"), "run_a.prom"),
+        "b": (os.path.join("out", "responses_b.csv"), "run_b.prom"),
+    }
+    assert args.metrics == "run.prom"
@@ -0,0 +1,78 @@
+import json
+import os
+
+import pandas as pd
+import pytest
+
+from generate_moral_machine_scenarios_robots import iter_batch_scenarios, scenario_hash
+from scenario_io import (
+    CSV_FILES, JSONL_FILE, PARQUET_DIR, STORE_FILE, load_prompt_frames, open_scenario_writer, read_scenario_store,
+    scenarios_from_csv, store_counts, store_prompts, store_scenario_info,
+)
+
+# chunks of 7, the last one partial
+SCENARIOS = list(iter_batch_scenarios(25, 3, block_size=10))
+
+
+def write(fmt, directory, scenarios=SCENARIOS, chunk_size=7):
+    with open_scenario_writer(fmt, str(directory), chunk_size) as writer:
+        for scenario in scenarios:
+            writer.write(scenario)
+    return writer
+
+
+def test_csv_writer_matches_one_write(tmp_path):
+    assert write("csv", tmp_path).nb_written == 25
+    for i, (column, filename) in enumerate(CSV_FILES.items()):
+        with open(os.path.join(tmp_path, filename)) as f:
+            assert f.read() == pd.DataFrame([scenario[i] for scenario in SCENARIOS]).to_csv(sep="|", index=False)
+    assert [scenario[:3] for scenario in scenarios_from_csv(str(tmp_path))] == [scenario[:3] for scenario in SCENARIOS]
+
+
+def test_jsonl_writer(tmp_path):
+    write("jsonl", tmp_path)
+    with open(os.path.join(tmp_path, JSONL_FILE)) as f:
+        records = [json.loads(line) for line in f]
+    assert [record["scenario_number"] for record in records] == list(range(1, 26))
+    assert [record["user_content_self_conscious"] for record in records] == [scenario[2] for scenario in SCENARIOS]
+    assert [record["scenario_hash"] for record in records] == [scenario_hash(scenario[3]) for scenario in SCENARIOS]
+
+
+def test_parquet_writer(tmp_path):
+    pq = pytest.importorskip("pyarrow.parquet")
+    write("parquet", tmp_path)
+    parts = sorted(os.listdir(os.path.join(tmp_path, PARQUET_DIR)))
+    assert parts == ["part-{:05}.parquet".format(i) for i in range(4)]
+    table = pq.read_table(os.path.join(tmp_path, PARQUET_DIR))
+    assert sorted(table.column("scenario_number").to_pylist()) == list(range(1, 26))
+
+
+def test_unknown_format(tmp_path):
+    with pytest.raises(ValueError):
+        open_scenario_writer("xml", str(tmp_path))
+
+
+def test_store_round_trip(tmp_path):
+    pytest.importorskip("pyarrow")
+    write("arrow", tmp_path)
+    path = os.path.join(tmp_path, STORE_FILE)
+    table = read_scenario_store(path)
+    assert table.column("scenario_id").to_pylist() == list(range(1, 26))
+    assert store_prompts(table, "user_content_self_conscious") == [scenario[2] for scenario in SCENARIOS]
+    assert store_prompts(table, "system_content") == [scenario[0] for scenario in SCENARIOS]
+    assert store_scenario_info(table) == [scenario[3] for scenario in SCENARIOS]
+    assert store_counts(table, 1).sum(axis=1).tolist() == [sum(scenario[3]["count_dict_1"].values()) for scenario in SCENARIOS]
+    system, user = load_prompt_frames(path)
+    assert user.iloc[:, 0].tolist() == [scenario[2] for scenario in SCENARIOS]
+
+
+@pytest.mark.parametrize("cut", [lambda size: size // 2, lambda size: size - 10])
+def test_store_keeps_complete_chunks(tmp_path, cut):
+    pytest.importorskip("pyarrow")
+    write("arrow", tmp_path)
+    path = os.path.join(tmp_path, STORE_FILE)
+    with open(path, "r+b") as f:
+        f.truncate(cut(os.path.getsize(path)))
+    ids = read_scenario_store(path).column("scenario_id").to_pylist()
+    assert ids == list(range(1, len(ids) + 1))
+    assert len(ids) % 7 == 0 and len(ids) < 25
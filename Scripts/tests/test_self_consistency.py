@@ -0,0 +1,25 @@
+from self_consistency import majority, sample_texts, vote_table
+
+
+def test_sample_texts():
+    assert sample_texts({"text": "a", "samples": ["a", "b"]}) == ["a", "b"]
+    assert sample_texts({"text": "a"}) == ["a"]
+    assert sample_texts({"text": "a", "samples": None}) == ["a"]
+
+
+def test_majority():
+    assert majority(["I choose Case 1.", "Final answer: Case 2", "Case 2 is the better choice."]) == 2
+    assert majority(["I choose Case 1.", "I choose Case 2."]) == 0
+    assert majority(["I choose Case 1.", "I cannot decide.", "Both are tragic."]) == 1
+    assert majority(["I cannot decide."]) == 0
+
+
+def test_vote_table():
+    records = [
+        {"scenario_id": 1, "text": "I choose Case 1.", "samples": ["I choose Case 1.", "I opt for Case 1.", "I choose Case 2."]},
+        {"scenario_id": 2, "text": "No decision.", "samples": None},
+    ]
+    votes = vote_table(records).set_index("scenario_id")
+    assert votes.loc[1, ["samples", "case_1", "case_2", "case_0", "majority"]].tolist() == [3, 2, 1, 0, 1]
+    assert votes.loc[1, "agreement"] == 2 / 3
+    assert votes.loc[2, ["samples", "case_0", "majority", "agreement"]].tolist() == [1, 1, 0, 0.0]
@@ -0,0 +1,34 @@
+import pytest
+
+from telemetry import Telemetry, cost, price
+
+
+def test_cache_answers_are_not_unpriced(tmp_path):
+    telemetry = Telemetry(str(tmp_path / "telemetry.jsonl"))
+    telemetry.record(1, "openai", "gpt-4.1", latency_s=1.0, input_tokens=1000, output_tokens=500)
+    telemetry.record(2, "openai", "gpt-4.1", source="cache")
+    assert "unpriced" not in telemetry.summary()
+    # a stream cut short without usage has no price
+    telemetry.record(3, "openai", "gpt-4.1", latency_s=1.0, output_tokens=20)
+    assert "1 unpriced" in telemetry.summary()
+    telemetry.close()
+    assert "mm_requests_total" in telemetry.prometheus()
+
+
+def test_price_snapshots_only():
+    assert price("anthropic", "claude-3-7-sonnet-20250219") == price("anthropic", "claude-3-7-sonnet")
+    assert price("anthropic", "claude-3-5-haiku-latest") == price("anthropic", "claude-3-5-haiku")
+    assert price("openai", "gpt-4.1-2025-04-14") == price("openai", "gpt-4.1")
+    assert price("openai", "gpt-4.1-mini") is None
+    assert price("google", "gemini-2.5-pro-exp-03-25") is None
+    assert price("ollama", "deepseek-llm:latest") == (0, 0, 0, 0)
+
+
+def test_cache_writes_cost_more_than_input():
+    # claude-3-7-sonnet: $3 input, $0.30 cache read, $3.75 cache write, $15 output per million
+    assert cost("anthropic", "claude-3-7-sonnet", 1000, 0) == pytest.approx(0.003)
+    assert cost("anthropic", "claude-3-7-sonnet", 1000, 0, cached_tokens=1000) == pytest.approx(0.0003)
+    assert cost("anthropic", "claude-3-7-sonnet", 1000, 0, cache_write_tokens=1000) == pytest.approx(0.00375)
+    assert cost("anthropic", "claude-3-7-sonnet", 1000, 100, cache_write_tokens=600, batch=True) == pytest.approx(
+        (400 * 3 + 600 * 3.75 + 100 * 15) / 1e6 / 2
+    )